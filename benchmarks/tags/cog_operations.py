@@ -0,0 +1,218 @@
+"""
+Benchmark the Tags cog's hot paths against in-memory stand-ins for Red, Config and discord.py:
+building guild tag caches, looking up and searching tags, processing tags end to end and saving
+a tag to Config. Results are printed as JSON so runs can be compared across versions.
+
+Run from the repository root::
+
+    python -m benchmarks.tags.cog_operations --guilds 50 --tags 200 --output results.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import time
+from typing import Dict, List
+
+import redbot
+import TagScriptEngine as tse
+
+from benchmarks.tags.standins import Bot, make_context, make_guild, red_environment
+from tags.core import Tags
+from tags.objects import GLOBAL_SCOPE
+
+SCRIPTS = {
+    "plain": "Hello there, this tag only has text.",
+    "variables": "{=(greeting):Hello}{greeting} {author(name)}, welcome to {server(name)}! {args}",
+    "control_flow": "{=(n):{#:1,2,3,4,5}}{if({n}>=3):big {math:{n}*10}|small {n}}",
+    "embed": "{embed(title):Tag {args}}{embed(description):{author(mention)} asked}"
+    "{embed(color):#37b2cb}",
+    "command": "{c:ping}{c:help tag}Running commands..",
+    "require": "{require(Moderator):You can't use this.}Only for moderators.",
+}
+
+SEARCH_QUERIES = ("tag1", "welcome", "embed title", "{c:", "xyzzy")
+
+
+def summarize(timings: List[float], unit: str) -> Dict[str, float]:
+    ordered = sorted(timings)
+    return {
+        f"mean_{unit}": round(statistics.fmean(ordered), 3),
+        f"median_{unit}": round(statistics.median(ordered), 3),
+        f"p95_{unit}": round(ordered[int(len(ordered) * 0.95) - 1], 3),
+        f"min_{unit}": round(ordered[0], 3),
+    }
+
+
+def make_tag_data(index: int) -> dict:
+    words = ("welcome", "rules", "{author(name)}", "{args}", "{embed(title):hi}", "lorem ipsum")
+    script = " ".join(words[(index + offset) % len(words)] for offset in range(index % 40 + 5))
+    return {
+        "author_id": index % 50,
+        "uses": index,
+        "tag": script,
+        "aliases": [f"alias{index}"] if index % 5 == 0 else [],
+        "created_at": 1600000000.0 + index,
+    }
+
+
+async def build_cog(bot: Bot) -> Tags:
+    cog = Tags(bot)
+    await cog.initialize_task
+    # don't let the schema backfill write in the background of a measurement
+    if cog.backfill_task:
+        await cog.backfill_task
+    return cog
+
+
+async def populate(cog: Tags, guild_ids: List[int], tag_count: int):
+    tags = {f"tag{index}": make_tag_data(index) for index in range(tag_count)}
+    for guild_id in guild_ids:
+        await cog.config.custom("Tag", str(guild_id)).set(tags)
+    await cog.config.custom("Tag", GLOBAL_SCOPE).set(
+        {f"global{index}": make_tag_data(index) for index in range(20)}
+    )
+
+
+async def bench_cache_build(bot: Bot, guild_ids: List[int], tag_count: int) -> dict:
+    cog = await build_cog(bot)
+    await populate(cog, guild_ids, tag_count)
+    await cog.cog_unload()
+
+    # a new cog over the same data starts with every guild uncached
+    cog = await build_cog(bot)
+    timings = []
+    for guild_id in guild_ids:
+        start = time.perf_counter()
+        await cog.cache_guild(guild_id)
+        timings.append((time.perf_counter() - start) * 1000)
+    assert sum(map(len, cog.guild_tag_cache.values())) >= len(guild_ids) * tag_count
+    await cog.cog_unload()
+    total = sum(timings)
+    return {
+        "guilds": len(guild_ids),
+        "tags_per_guild": tag_count,
+        "total_ms": round(total, 3),
+        "per_tag_us": round(total * 1000 / (len(guild_ids) * tag_count), 3),
+        **summarize(timings, "ms"),
+    }
+
+
+def bench_lookup(cog: Tags, guild, tag_count: int, samples: int) -> dict:
+    rng = random.Random(0)
+    kinds = {
+        "name": [f"tag{rng.randrange(tag_count)}" for _ in range(samples)],
+        "alias": [f"alias{rng.randrange(0, tag_count, 5)}" for _ in range(samples)],
+        "global_fallback": [f"global{rng.randrange(20)}" for _ in range(samples)],
+        "missing": [f"missing{index}" for index in range(samples)],
+    }
+    results = {}
+    for kind, names in kinds.items():
+        start = time.perf_counter()
+        for name in names:
+            cog.get_tag(guild, name)
+        results[f"{kind}_ns"] = round((time.perf_counter() - start) * 1e9 / samples, 1)
+    return results
+
+
+def bench_search(cog: Tags, guild, samples: int) -> dict:
+    results = {}
+    for query in SEARCH_QUERIES:
+        timings = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            cog.search_tag(query, guild)
+            timings.append((time.perf_counter() - start) * 1000)
+        results[query] = summarize(timings, "ms")
+    return results
+
+
+async def bench_process_tag(cog: Tags, guild, samples: int) -> dict:
+    results = {}
+    for name, script in SCRIPTS.items():
+        ctx = make_context(guild)
+        tag = cog.get_tag(guild, "tag0")
+        tag.tagscript = script
+        timings = []
+        for _ in range(samples + 1):
+            start = time.perf_counter()
+            await cog.process_tag(ctx, tag, seed_variables={"args": tse.StringAdapter("world")})
+            timings.append((time.perf_counter() - start) * 1_000_000)
+        # the first run parses the tagscript, later runs reuse it
+        results[name] = {"first_us": round(timings[0], 3), **summarize(timings[1:], "us")}
+    return results
+
+
+async def bench_update_config(driver: str, tag_count: int, samples: int) -> dict:
+    with red_environment(driver):
+        guild = make_guild(1)
+        cog = await build_cog(Bot([guild]))
+        await populate(cog, [guild.id], tag_count)
+        await cog.cache_guild(guild.id)
+        tags = cog.get_unique_tags(guild)
+        assert len(tags) == tag_count
+        timings = []
+        for index in range(samples):
+            tag = tags[index % len(tags)]
+            tag.uses += 1
+            start = time.perf_counter()
+            await tag.update_config()
+            timings.append((time.perf_counter() - start) * 1000)
+        await cog.cog_unload()
+    return summarize(timings, "ms")
+
+
+async def main(args: argparse.Namespace) -> dict:
+    results = {
+        "environment": {
+            "python": platform.python_version(),
+            "red": redbot.__version__,
+            "tagscriptengine": tse.__version__,
+        },
+        "parameters": vars(args).copy(),
+    }
+    results["parameters"].pop("output")
+
+    guilds = [make_guild(guild_id) for guild_id in range(1, args.guilds + 1)]
+    with red_environment("memory"):
+        bot = Bot(guilds)
+        results["cache_build"] = await bench_cache_build(
+            bot, [guild.id for guild in guilds], args.tags
+        )
+
+        large = make_guild(args.guilds + 1)
+        bot._guilds[large.id] = large
+        cog = await build_cog(bot)
+        await populate(cog, [large.id], args.large_tags)
+        await cog.cache_guild(large.id)
+        results["get_tag"] = bench_lookup(cog, large, args.large_tags, args.samples * 100)
+        results["search_tag"] = bench_search(cog, large, args.samples)
+        results["process_tag"] = await bench_process_tag(cog, large, args.samples)
+        await cog.cog_unload()
+
+    results["update_config"] = {
+        driver: await bench_update_config(driver, args.tags, args.samples)
+        for driver in ("memory", "json")
+    }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--guilds", type=int, default=50, help="Guilds in the cache build.")
+    parser.add_argument("--tags", type=int, default=200, help="Tags per cache build guild.")
+    parser.add_argument(
+        "--large-tags", type=int, default=2000, help="Tags in the guild that's searched."
+    )
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--output", help="Also write the results to this file.")
+    args = parser.parse_args()
+    results = asyncio.run(main(args))
+    output = json.dumps(results, indent=4)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fp:
+            fp.write(output + "\n")
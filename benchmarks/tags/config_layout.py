@@ -0,0 +1,90 @@
+"""
+Compare the cost of saving a single tag in the legacy per-guild ``tags`` dict against the
+per-tag ``Tag`` custom group.
+
+Run from the repository root::
+
+    python -m benchmarks.tags.config_layout --tags 1000
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from redbot.core._drivers import JsonDriver
+from redbot.core.config import Config
+
+COG_NAME = "Tags"
+IDENTIFIER = "567234895692346562369"
+GUILD_ID = 133049272517001216
+
+
+def make_tag(index: int) -> dict:
+    return {
+        "author_id": 0,
+        "uses": index,
+        "tag": "{embed(title):Tag %s}{embed(description):%s}" % (index, "lorem ipsum " * 40),
+        "aliases": [],
+        "created_at": 1600000000.0 + index,
+    }
+
+
+def get_config(path: Path) -> Config:
+    driver = JsonDriver(COG_NAME, IDENTIFIER, data_path_override=path)
+    config = Config(COG_NAME, IDENTIFIER, driver, force_registration=True)
+    config.register_guild(tags={})
+    config.init_custom("Tag", 2)
+    config.register_custom("Tag", author_id=None, uses=0, tag=None, aliases=[], created_at=None)
+    return config
+
+
+async def legacy_write(config: Config, name: str, data: dict):
+    async with config.guild_from_id(GUILD_ID).tags() as t:
+        t[name] = data
+
+
+async def custom_write(config: Config, name: str, data: dict):
+    await config.custom("Tag", str(GUILD_ID), name).set(data)
+
+
+async def measure(write, config: Config, tags: dict, samples: int) -> dict:
+    names = list(tags)
+    timings = []
+    for index in range(samples):
+        name = names[index % len(names)]
+        data = tags[name]
+        data["uses"] += 1
+        start = time.perf_counter()
+        await write(config, name, data)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "mean_ms": round(statistics.fmean(timings), 4),
+        "median_ms": round(statistics.median(timings), 4),
+        "max_ms": round(max(timings), 4),
+    }
+
+
+async def main(tag_count: int, samples: int):
+    tags = {f"tag{i}": make_tag(i) for i in range(tag_count)}
+    results = {"tags": tag_count, "samples": samples}
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_config = get_config(Path(tmp, "legacy"))
+        await legacy_config.guild_from_id(GUILD_ID).tags.set(tags)
+        results["legacy"] = await measure(legacy_write, legacy_config, tags, samples)
+
+        custom_config = get_config(Path(tmp, "custom"))
+        await custom_config.custom("Tag", str(GUILD_ID)).set(tags)
+        results["per_tag"] = await measure(custom_write, custom_config, tags, samples)
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tags", type=int, default=1000)
+    parser.add_argument("--samples", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.tags, args.samples))
@@ -0,0 +1,121 @@
+"""
+Compare eagerly built seed variables against lazily created ``SeedVariables`` for a tag that
+uses no seed variables and one that only uses ``{author}``.
+
+Discord objects are replaced with lightweight stand-ins, so the guild's member list can be sized
+freely.
+
+Run from the repository root::
+
+    python -m benchmarks.tags.seed_variables --members 5000
+"""
+
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import TagScriptEngine as tse
+
+from benchmarks.tags.standins import StandIn, make_member
+from tags.seed import SEED_NAMES, SeedVariables
+
+SCRIPTS = {
+    "no_seeds": "{=(greeting):Hello}{greeting}, {args}!",
+    "author_only": "Hello {author(name)}, you joined at {author(joined_at)}.",
+}
+
+
+def make_context(member_count: int) -> SimpleNamespace:
+    members = [make_member(index) for index in range(1, member_count + 1)]
+    created_at = datetime.fromtimestamp(1500000000, timezone.utc)
+    guild = StandIn(
+        id=1,
+        name="Benchmark Server",
+        created_at=created_at,
+        members=members,
+        member_count=member_count,
+        icon=None,
+        description=None,
+    )
+    channel = StandIn(id=2, name="general", created_at=created_at)
+    return SimpleNamespace(
+        author=members[0],
+        channel=channel,
+        guild=guild,
+        message=SimpleNamespace(mentions=[]),
+    )
+
+
+def eager_seed(ctx: SimpleNamespace) -> dict:
+    # the seed built by Processor.get_seed_from_context before adapters became lazy
+    author = tse.MemberAdapter(ctx.author)
+    target = tse.MemberAdapter(ctx.message.mentions[0]) if ctx.message.mentions else author
+    channel = tse.ChannelAdapter(ctx.channel)
+    guild = tse.GuildAdapter(ctx.guild)
+    return {
+        "author": author,
+        "user": author,
+        "target": target,
+        "member": target,
+        "channel": channel,
+        "guild": guild,
+        "server": guild,
+    }
+
+
+def run(build_seed, interpreter: tse.Interpreter, ctx, script: str) -> dict:
+    seed = build_seed(ctx)
+    seed["args"] = tse.StringAdapter("world")
+    interpreter.process(script, seed)
+    return seed
+
+
+def measure(build_seed, interpreter: tse.Interpreter, ctx, script: str, samples: int) -> dict:
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        run(build_seed, interpreter, ctx, script)
+        timings.append((time.perf_counter() - start) * 1_000_000)
+
+    # bytes still held by the seed and its adapters once the tag has been processed
+    tracemalloc.start()
+    seed = run(build_seed, interpreter, ctx, script)
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    adapters = {id(adapter) for name, adapter in dict.items(seed) if name in SEED_NAMES}
+    return {
+        "mean_us": round(statistics.fmean(timings), 2),
+        "median_us": round(statistics.median(timings), 2),
+        "adapters_created": len(adapters),
+        "retained_bytes": retained,
+    }
+
+
+def main(member_count: int, samples: int):
+    ctx = make_context(member_count)
+    interpreter = tse.Interpreter(
+        [
+            tse.AssignmentBlock(),
+            tse.LooseVariableGetterBlock(),
+            tse.ShortCutRedirectBlock("args"),
+        ]
+    )
+    results = {"members": member_count, "samples": samples}
+    for name, script in SCRIPTS.items():
+        results[name] = {
+            "eager": measure(eager_seed, interpreter, ctx, script, samples),
+            "lazy": measure(SeedVariables, interpreter, ctx, script, samples),
+        }
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--members", type=int, default=1000)
+    parser.add_argument("--samples", type=int, default=200)
+    args = parser.parse_args()
+    main(args.members, args.samples)
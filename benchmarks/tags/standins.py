@@ -0,0 +1,232 @@
+"""
+In-memory stand-ins for Red, Config and the discord.py objects the Tags cog touches, so it can
+be built and driven without a bot, a network connection or a Red data directory.
+"""
+
+import asyncio
+import contextlib
+import tempfile
+from datetime import datetime, timezone
+from itertools import count
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional
+
+import redbot.core.config as red_config
+from redbot.core import data_manager
+from redbot.core._drivers import BaseDriver, JsonDriver
+
+__all__ = (
+    "StandIn",
+    "MemoryDriver",
+    "Bot",
+    "make_member",
+    "make_guild",
+    "make_context",
+    "red_environment",
+)
+
+_message_ids = count(1)
+_environment_ids = count(1)
+
+
+class StandIn(SimpleNamespace):
+    # like discord models, str() is the name rather than a repr of every attribute
+    def __str__(self) -> str:
+        return self.name
+
+
+class MemoryDriver(JsonDriver):
+    """A JSON driver that keeps its data in the given dict and never touches the disk."""
+
+    def __init__(self, cog_name: str, identifier: str, *, store: dict):
+        BaseDriver.__init__(self, cog_name, identifier)
+        self._store = store
+        self._memory_lock = asyncio.Lock()
+
+    @property
+    def _lock(self) -> asyncio.Lock:
+        return self._memory_lock
+
+    @property
+    def data(self) -> dict:
+        return self._store.setdefault(self.cog_name, {})
+
+    @data.setter
+    def data(self, value: dict):
+        self._store[self.cog_name] = value
+
+    async def _save(self):
+        pass
+
+
+@contextlib.contextmanager
+def red_environment(driver: str = "memory") -> Iterator[Path]:
+    """
+    Point Red's data manager at a temporary directory and give Configs created inside it a
+    driver whose data starts empty and lasts until the environment exits.
+
+    `driver` is ``memory`` for `MemoryDriver`, or ``json`` for Red's JSON driver writing to
+    the temporary directory.
+    """
+    old_basic_config = data_manager.basic_config
+    old_get_driver = red_config.get_driver
+    # Config reuses live instances with the same cog name and identifier
+    old_configs = dict(red_config._config_cache)
+    red_config._config_cache.clear()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp)
+        data_manager.basic_config = {
+            "DATA_PATH": tmp,
+            "COG_PATH_APPEND": "cogs",
+            "CORE_PATH_APPEND": "core",
+            "STORAGE_TYPE": "JSON",
+            "STORAGE_DETAILS": {},
+        }
+        if driver == "memory":
+            store = {}
+            red_config.get_driver = lambda cog_name, identifier, **kwargs: MemoryDriver(
+                cog_name, identifier, store=store
+            )
+        else:
+            # JsonDriver shares data between every instance with the same cog name
+            suffix = next(_environment_ids)
+            red_config.get_driver = lambda cog_name, identifier, **kwargs: JsonDriver(
+                f"{cog_name}{suffix}", identifier, data_path_override=path
+            )
+        try:
+            yield path
+        finally:
+            data_manager.basic_config = old_basic_config
+            red_config.get_driver = old_get_driver
+            red_config._config_cache.clear()
+            red_config._config_cache.update(old_configs)
+
+
+class Messageable(StandIn):
+    async def send(self, content: str = None, **kwargs) -> StandIn:
+        return make_message(self, content)
+
+
+def make_member(member_id: int) -> StandIn:
+    created_at = datetime.fromtimestamp(1600000000 + member_id, timezone.utc)
+    return Messageable(
+        id=member_id,
+        name=f"member{member_id}",
+        created_at=created_at,
+        joined_at=created_at,
+        display_avatar=SimpleNamespace(url="https://cdn.discordapp.com/embed/avatars/0.png"),
+        color=0,
+        display_name=f"member{member_id}",
+        discriminator="0001",
+        mention=f"<@{member_id}>",
+        bot=member_id % 10 == 0,
+        top_role="@everyone",
+        _roles=[1, 2, 3],
+    )
+
+
+def make_message(channel: StandIn, content: str = None, author: StandIn = None) -> StandIn:
+    message_id = next(_message_ids)
+    return StandIn(
+        id=message_id,
+        name=str(message_id),
+        content=content,
+        author=author,
+        channel=channel,
+        guild=getattr(channel, "guild", None),
+        mentions=[],
+        add_reaction=_noop,
+        delete=_noop,
+        to_reference=lambda **kwargs: None,
+    )
+
+
+async def _noop(*args, **kwargs):
+    pass
+
+
+def make_guild(guild_id: int, member_count: int = 100) -> StandIn:
+    created_at = datetime.fromtimestamp(1500000000, timezone.utc)
+    members = [make_member(guild_id * 100_000 + index) for index in range(member_count)]
+    guild = StandIn(
+        id=guild_id,
+        name=f"Server {guild_id}",
+        created_at=created_at,
+        members=members,
+        member_count=member_count,
+        icon=None,
+        description=None,
+        roles=[],
+        channels=[],
+        get_role=lambda role_id: None,
+        get_channel=lambda channel_id: None,
+        get_member=lambda member_id: None,
+    )
+    guild.me = members[0]
+    return guild
+
+
+def make_context(guild: Optional[StandIn], author: StandIn = None, prefix: str = "!") -> StandIn:
+    author = author or (guild.members[-1] if guild else make_member(1))
+    channel = Messageable(
+        id=(guild.id if guild else 0) + 1,
+        name="general",
+        created_at=datetime.fromtimestamp(1500000000, timezone.utc),
+        guild=guild,
+    )
+    message = make_message(channel, author=author)
+    return StandIn(
+        name="context",
+        author=author,
+        channel=channel,
+        guild=guild,
+        message=message,
+        me=guild.me if guild else None,
+        prefix=prefix,
+        send=channel.send,
+        bot=None,
+    )
+
+
+class Bot:
+    """Just enough of `redbot.core.bot.Red` for the Tags cog."""
+
+    def __init__(self, guilds: List[StandIn] = ()):
+        self._guilds: Dict[int, StandIn] = {guild.id: guild for guild in guilds}
+        self._cli_flags = SimpleNamespace(logging_level=0)
+        self.dispatched = 0
+
+    @property
+    def guilds(self) -> List[StandIn]:
+        return list(self._guilds.values())
+
+    def get_guild(self, guild_id: int) -> Optional[StandIn]:
+        return self._guilds.get(guild_id)
+
+    def get_user(self, user_id: int):
+        return None
+
+    def get_command(self, name: str):
+        return None
+
+    def is_ws_ratelimited(self) -> bool:
+        return False
+
+    async def is_owner(self, user) -> bool:
+        return False
+
+    def dispatch(self, event: str, *args):
+        self.dispatched += 1
+
+    def add_dev_env_value(self, name: str, value):
+        pass
+
+    def remove_dev_env_value(self, name: str):
+        pass
+
+    async def get_context(self, message: StandIn, *, cls=None) -> StandIn:
+        return StandIn(name="context", message=message, valid=False)
+
+    async def invoke(self, ctx):
+        pass
@@ -26,7 +26,7 @@ import asyncio
 import logging
 from collections import defaultdict
 from functools import partial
-from typing import Coroutine, Dict, Optional
+from typing import Coroutine, Dict, List, Optional, Tuple
 
 import aiohttp
 import discord
@@ -46,6 +46,25 @@ from .views import ConfirmationView
 
 log = logging.getLogger("red.phenom4n4n.slashtags")
 
+# fields of an existing command that can be sent back in a bulk overwrite
+BULK_COMMAND_FIELDS = frozenset(
+    {
+        "id",
+        "type",
+        "name",
+        "name_localizations",
+        "description",
+        "description_localizations",
+        "options",
+        "default_member_permissions",
+        "dm_permission",
+        "default_permission",
+        "nsfw",
+        "integration_types",
+        "contexts",
+    }
+)
+
 
 class SlashTags(Commands, Processor, commands.Cog, metaclass=CompositeMetaClass):
     """
@@ -251,11 +270,78 @@ class SlashTags(Commands, Processor, commands.Cog, metaclass=CompositeMetaClass)
             return
         msg = await ctx.send(f"Restoring {len(slashtags)} slash tag{s}...")
         async with ctx.typing():
-            for tag in slashtags.copy().values():
-                await tag.restore()
+            synced, failed = await self.sync_tags(guild)
         await self.delete_quietly(msg)
-        s = "s" if len(slashtags) > 1 else ""
-        await ctx.send(f"Restored {len(slashtags)} slash tag{s}.")
+        s = "s" if synced != 1 else ""
+        message = f"Restored {synced} slash tag{s}."
+        if failed:
+            failed_names = humanize_list([f"`{tag}`" for tag in failed])
+            message += f" {len(failed)} failed to restore: {failed_names}"
+        await ctx.send(message)
+
+    async def sync_tags(self, guild: Optional[discord.Guild] = None) -> Tuple[int, List[SlashTag]]:
+        """
+        Overwrite a scope's application commands with its slash tags in one bulk request.
+
+        Commands in the scope that don't belong to a slash tag, such as the eval command, are
+        kept. Tags are registered one at a time only if the bulk request fails or leaves them
+        out. Returns the number of restored tags and the tags that couldn't be restored.
+        """
+        cache = self.guild_tag_cache[guild.id] if guild else self.global_tag_cache
+        tags = list(cache.values())
+        if not tags:
+            return 0, []
+
+        tag_keys = {(tag.name, tag.type.value) for tag in tags}
+        try:
+            if guild:
+                existing = await self.http.get_guild_slash_commands(guild.id)
+            else:
+                existing = await self.http.get_slash_commands()
+            payload = [
+                {key: value for key, value in command.items() if key in BULK_COMMAND_FIELDS}
+                for command in existing
+                if int(command["id"]) not in cache
+                and (command["name"], command.get("type", 1)) not in tag_keys
+            ]
+            payload.extend(tag.command.to_request() for tag in tags)
+            if guild:
+                data = await self.http.put_guild_slash_commands(guild.id, payload)
+            else:
+                data = await self.http.put_slash_commands(payload)
+        except discord.HTTPException as error:
+            log.warning(
+                "Bulk overwrite of %s slash tags in %s failed, restoring them individually.",
+                len(tags),
+                f"guild {guild.id}" if guild else "the global scope",
+                exc_info=error,
+            )
+            data = []
+
+        registered = {(command["name"], command.get("type", 1)): command for command in data}
+        missing = []
+        for tag in tags:
+            if (command_data := registered.get((tag.name, tag.type.value))) is None:
+                missing.append(tag)
+                continue
+            tag.remove_from_cache()
+            tag.command._parse_response_data(command_data)
+            tag.add_to_cache()
+
+        failed = []
+        for tag in missing:
+            tag.remove_from_cache()
+            try:
+                await tag.command.register()
+            except discord.HTTPException as error:
+                log.warning("Failed to restore slash tag %r.", tag.name, exc_info=error)
+                failed.append(tag)
+            tag.add_to_cache()
+
+        # command IDs may have changed, so the scope's tags are rewritten under their new IDs
+        config_path = self.config.guild(guild) if guild else self.config
+        await config_path.tags.set({str(tag.id): tag.to_dict() for tag in cache.values()})
+        return len(tags) - len(failed), failed
 
     def get_command(self, command_id: int) -> ApplicationCommand:
         return self.command_cache.get(command_id)
@@ -0,0 +1,112 @@
+"""
+MIT License
+
+Copyright (c) 2020-present phenom4n4n
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import hashlib
+import importlib.util
+import logging
+import marshal
+import os
+from pathlib import Path
+from types import CodeType
+from typing import Iterable, Optional
+
+__all__ = ("BlockCodeCache", "source_hash")
+
+log = logging.getLogger("red.phenom4n4n.tags.block_cache")
+
+
+def source_hash(source: str) -> str:
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+class BlockCodeCache:
+    """
+    Stores compiled custom block code on disk, keyed by the hash of the block source.
+
+    Files are prefixed with the interpreter's bytecode magic number, so code compiled by a
+    different Python version is ignored and recompiled.
+    """
+
+    __slots__ = ("path", "hits", "misses")
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self) -> str:
+        return f"<BlockCodeCache path={str(self.path)!r} hits={self.hits} misses={self.misses}>"
+
+    def _file(self, key: str) -> Path:
+        return self.path / f"{key}.marshal"
+
+    def get(self, key: str) -> Optional[CodeType]:
+        try:
+            data = self._file(key).read_bytes()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except OSError as error:
+            log.debug("Failed to read cached block code %s.", key, exc_info=error)
+            self.misses += 1
+            return None
+
+        magic = importlib.util.MAGIC_NUMBER
+        if not data.startswith(magic):
+            self.misses += 1
+            return None
+        try:
+            code = marshal.loads(data[len(magic) :])
+        except (EOFError, ValueError, TypeError):
+            self.misses += 1
+            return None
+        if not isinstance(code, CodeType):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return code
+
+    def set(self, key: str, code: CodeType):
+        file = self._file(key)
+        temp = file.with_suffix(".tmp")
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            temp.write_bytes(importlib.util.MAGIC_NUMBER + marshal.dumps(code))
+            os.replace(temp, file)
+        except OSError as error:
+            log.warning("Failed to cache compiled block code %s.", key, exc_info=error)
+
+    def prune(self, keys: Iterable[str]):
+        """Delete cached code for any block source not in `keys`."""
+        keep = set(keys)
+        try:
+            files = list(self.path.glob("*.marshal"))
+        except OSError:
+            return
+        for file in files:
+            if file.stem not in keep:
+                try:
+                    file.unlink()
+                except OSError:
+                    pass
@@ -22,6 +22,7 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+from .cooldown import CooldownBlock
 from .customcom import ContextVariableBlock, ConverterBlock
 from .delete import DeleteBlock
 from .react import ReactBlock
@@ -33,4 +34,5 @@ __all__ = (
     "ReactBlock",
     "ContextVariableBlock",
     "ConverterBlock",
+    "CooldownBlock",
 )
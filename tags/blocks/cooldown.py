@@ -0,0 +1,131 @@
+"""
+MIT License
+
+Copyright (c) 2020-present phenom4n4n
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Iterator, Tuple
+
+import TagScriptEngine as tse
+from discord.ext.commands import CooldownMapping
+
+__all__ = ("CooldownStore", "CooldownBlock")
+
+DEFAULT_MAX_SIZE = 10000
+
+
+class CooldownStore(MutableMapping):
+    """
+    Cooldown mappings keyed by tag, evicted once they expire or the store is full.
+
+    A mapping expires `per` seconds after its tag last used it, at which point every bucket in
+    it would have reset anyway. Past `max_size`, the least recently used mappings are dropped.
+
+    Tags processed on the interpreter's worker threads use the store alongside the event loop,
+    so every access holds a lock.
+    """
+
+    __slots__ = ("_entries", "_lock", "max_size")
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_size = max_size
+
+    def __repr__(self) -> str:
+        return f"<CooldownStore entries={len(self)} max_size={self.max_size}>"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Any]:
+        with self._lock:
+            return iter(list(self._entries))
+
+    @staticmethod
+    def _expired(entry: Tuple[CooldownMapping, float], now: float) -> bool:
+        mapping, last_used = entry
+        return now > last_used + mapping._cooldown.per
+
+    def __getitem__(self, key: Any) -> CooldownMapping:
+        with self._lock:
+            entry = self._entries[key]
+            now = time.time()
+            if self._expired(entry, now):
+                del self._entries[key]
+                raise KeyError(key)
+            self._entries[key] = (entry[0], now)
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def __setitem__(self, key: Any, mapping: CooldownMapping):
+        with self._lock:
+            self._entries[key] = (mapping, time.time())
+            self._entries.move_to_end(key)
+            self._shrink()
+
+    def __delitem__(self, key: Any):
+        with self._lock:
+            del self._entries[key]
+
+    def _shrink(self):
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def shrink(self):
+        with self._lock:
+            self._shrink()
+
+    def prune(self) -> int:
+        """Remove every expired mapping, returning how many were removed."""
+        now = time.time()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if self._expired(entry, now)]
+            for key in expired:
+                del self._entries[key]
+        return len(expired)
+
+    def _mappings(self) -> list:
+        with self._lock:
+            return list(self._entries.items())
+
+    def bucket_count(self) -> int:
+        return sum(len(mapping._cache) for _, (mapping, _) in self._mappings())
+
+    def memory_usage(self) -> int:
+        """Estimate the bytes used by the store, its mappings and their buckets."""
+        size = sys.getsizeof(self._entries)
+        for key, (mapping, _) in self._mappings():
+            size += sys.getsizeof(key) + sys.getsizeof(mapping) + sys.getsizeof(mapping._cache)
+            # buckets are added by worker threads too, so iterate over a snapshot
+            for bucket_key, bucket in list(mapping._cache.items()):
+                size += sys.getsizeof(bucket_key) + sys.getsizeof(bucket)
+        return size
+
+
+class CooldownBlock(tse.CooldownBlock):
+    # stores cooldowns separately from other cogs using TagScriptEngine's cooldown block
+    COOLDOWNS = CooldownStore()
@@ -0,0 +1,83 @@
+"""
+MIT License
+
+Copyright (c) 2020-present phenom4n4n
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from collections import OrderedDict, defaultdict
+from typing import Dict, FrozenSet, NamedTuple, Optional, Tuple
+
+__all__ = ("ResolvedItems", "CheckCache")
+
+GUILD_CACHE_SIZE = 256
+
+
+class ResolvedItems(NamedTuple):
+    """The roles and channels that a require or blacklist block's items converted to."""
+
+    role_ids: FrozenSet[int]
+    channel_ids: FrozenSet[int]
+
+    def matches(self, role_ids, channel_id: int) -> bool:
+        return channel_id in self.channel_ids or not self.role_ids.isdisjoint(role_ids)
+
+
+class CheckCache:
+    """
+    Resolved require and blacklist items, per guild.
+
+    Items are resolved by role and channel names, so a guild's entries are cleared whenever
+    one of its roles or channels is created, updated or deleted. Each guild keeps its
+    `GUILD_CACHE_SIZE` most recently used item lists.
+    """
+
+    __slots__ = ("_guilds", "hits", "misses")
+
+    def __init__(self):
+        self._guilds: Dict[Optional[int], OrderedDict] = defaultdict(OrderedDict)
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __repr__(self) -> str:
+        return f"<CheckCache guilds={len(self._guilds)} hits={self.hits} misses={self.misses}>"
+
+    def get(self, guild_id: Optional[int], items: Tuple[str, ...]) -> Optional[ResolvedItems]:
+        cache = self._guilds.get(guild_id)
+        if cache is None or (resolved := cache.get(items)) is None:
+            self.misses += 1
+            return None
+        cache.move_to_end(items)
+        self.hits += 1
+        return resolved
+
+    def set(self, guild_id: Optional[int], items: Tuple[str, ...], resolved: ResolvedItems):
+        cache = self._guilds[guild_id]
+        cache[items] = resolved
+        if len(cache) > GUILD_CACHE_SIZE:
+            cache.popitem(last=False)
+
+    def invalidate(self, guild_id: Optional[int]):
+        self._guilds.pop(guild_id, None)
+        # channels can be resolved by ID outside of guilds
+        self._guilds.pop(None, None)
+
+    def clear(self):
+        self._guilds.clear()
@@ -0,0 +1,135 @@
+"""
+MIT License
+
+Copyright (c) 2020-present phenom4n4n
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import sys
+import zlib
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Iterable, Union
+
+if TYPE_CHECKING:
+    from .objects import Tag
+
+__all__ = ("TagScriptStore", "COMPACT_MIN_LENGTH", "measure_tags")
+
+# compressing short tagscripts saves little or nothing once zlib's header is counted
+COMPACT_MIN_LENGTH = 128
+
+
+class TagScriptStore:
+    """
+    Keeps cold tagscripts zlib-compressed when compact mode is enabled.
+
+    Tags store the packed form of their tagscript, and recently used tagscripts are served
+    decompressed from an LRU of at most `max_size` entries. Parsed tagscripts are dropped
+    along with a tag's LRU entry, since they're only worth keeping for hot tags.
+
+    Reads that aren't invocations, such as indexing, searching and listing, should use `peek`
+    so they don't evict the tags that are actually being used.
+    """
+
+    __slots__ = ("enabled", "max_size", "_hot", "hits", "misses")
+
+    def __init__(self, enabled: bool = False, max_size: int = 1000):
+        self.enabled = enabled
+        self.max_size = max_size
+        self._hot: "OrderedDict[Tag, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"<TagScriptStore enabled={self.enabled} hot={len(self._hot)}/{self.max_size} "
+            f"hits={self.hits} misses={self.misses}>"
+        )
+
+    def __len__(self) -> int:
+        return len(self._hot)
+
+    def pack(self, tagscript: str) -> Union[str, bytes]:
+        if not self.enabled or len(tagscript) < COMPACT_MIN_LENGTH:
+            return tagscript
+        return zlib.compress(tagscript.encode())
+
+    def unpack(self, tag: "Tag", packed: Union[str, bytes]) -> str:
+        if isinstance(packed, str):
+            return packed
+        hot = self._hot
+        try:
+            tagscript = hot[tag]
+        except KeyError:
+            pass
+        else:
+            hot.move_to_end(tag)
+            self.hits += 1
+            return tagscript
+
+        self.misses += 1
+        tagscript = zlib.decompress(packed).decode()
+        if self.max_size > 0:
+            hot[tag] = tagscript
+            while len(hot) > self.max_size:
+                evicted, _ = hot.popitem(last=False)
+                evicted._parsed = None
+        return tagscript
+
+    def peek(self, tag: "Tag", packed: Union[str, bytes]) -> str:
+        """Get a tagscript without adding it to the LRU or marking it as recently used."""
+        if isinstance(packed, str):
+            return packed
+        try:
+            return self._hot[tag]
+        except KeyError:
+            return zlib.decompress(packed).decode()
+
+    def discard(self, tag: "Tag"):
+        self._hot.pop(tag, None)
+
+    def clear(self):
+        for tag in self._hot:
+            tag._parsed = None
+        self._hot.clear()
+
+    def resize(self, max_size: int):
+        self.max_size = max_size
+        while len(self._hot) > max_size:
+            evicted, _ = self._hot.popitem(last=False)
+            evicted._parsed = None
+
+    def memory_usage(self) -> int:
+        return sys.getsizeof(self._hot) + sum(map(sys.getsizeof, self._hot.values()))
+
+
+def measure_tags(tags: Iterable["Tag"]) -> Dict[str, int]:
+    """Estimate the bytes held by tag objects and their stored and parsed tagscripts."""
+    usage = {"tags": 0, "tagscripts": 0, "parsed": 0}
+    for tag in tags:
+        usage["tags"] += sys.getsizeof(tag) + sys.getsizeof(tag._aliases)
+        usage["tagscripts"] += sys.getsizeof(tag._tagscript)
+        if parsed := tag._parsed:
+            usage["parsed"] += sys.getsizeof(parsed) + sys.getsizeof(parsed.coordinates)
+            usage["parsed"] += sum(
+                sys.getsizeof(pair) + sys.getsizeof(pair[0]) + sys.getsizeof(pair[1])
+                for pair in parsed.coordinates
+            )
+    return usage
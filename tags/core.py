@@ -24,29 +24,35 @@ SOFTWARE.
 
 import asyncio
 import logging
-import re
-from collections import defaultdict
-from operator import itemgetter
-from typing import Coroutine, List, Optional
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Coroutine, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
 
 import aiohttp
 import discord
-from rapidfuzz import fuzz, process
 from redbot.core import commands
 from redbot.core.bot import Red
 from redbot.core.config import Config
 from redbot.core.utils import AsyncIter
 from redbot.core.utils.chat_formatting import humanize_list
 from TagScriptEngine import __version__ as tse_version
+from TagScriptEngine.interpreter import build_node_tree
 
 from .abc import CompositeMetaClass
+from .blocks import CooldownBlock
+from .compact import TagScriptStore, measure_tags
 from .errors import MissingTagPermissions, TagCharacterLimitReached
+from .interpreter import RESTRICTED_ACTIONS, scan_declarations
+from .limiter import InvocationLimiter
+from .listing import TagListing
 from .mixins import Commands, OwnerCommands, Processor
-from .objects import Tag
+from .objects import GLOBAL_SCOPE, TAGSCRIPT_LIMIT, Tag
+from .search import TagSearchIndex
 
 log = logging.getLogger("red.phenom4n4n.tags")
 
-TAGSCRIPT_LIMIT = 10_000
+VALIDATION_CACHE_SIZE = 512
 
 
 class Tags(
@@ -85,15 +91,62 @@ class Tags(
             force_registration=True,
         )
         default_guild = {"tags": {}}
-        default_global = {"tags": {}, "blocks": {}, "async_enabled": False, "dot_parameter": False}
+        default_global = {
+            "tags": {},
+            "blocks": {},
+            "async_enabled": False,
+            "dot_parameter": False,
+            "usage_flush_interval": 60,
+            "schema_version": 1,
+            "search_workers": 1,
+            "eager_cache_guilds": 0,
+            "active_guilds": [],
+            "interpreter_threads": 0,
+            "interpreter_timeout": 10.0,
+            "slow_tag_threshold": 0,
+            "command_block_mode": "ordered",
+            "cooldown_limit": 10000,
+            "guild_concurrency": 5,
+            "global_concurrency": 50,
+            "tag_queue_size": 20,
+            "compact_tagscripts": False,
+            "tagscript_cache_size": 1000,
+            "author_index_built": False,
+        }
+        default_tag = {
+            "author_id": None,
+            "uses": 0,
+            "tag": None,
+            "aliases": [],
+            "created_at": None,
+        }
         self.config.register_guild(**default_guild)
         self.config.register_global(**default_global)
+        self.config.init_custom("Tag", 2)
+        self.config.register_custom("Tag", **default_tag)
+        # (scope, name) pairs of the tags each user has created, for data deletion requests
+        self.config.init_custom("TagAuthor", 1)
+        self.config.register_custom("TagAuthor", tags=[])
 
         self.guild_tag_cache = defaultdict(dict)
         self.global_tag_cache = {}
+        self.search_indexes: Dict[Optional[int], TagSearchIndex] = defaultdict(TagSearchIndex)
+        self.tag_listings: Dict[Optional[int], TagListing] = defaultdict(TagListing)
+        self.tagscript_store = TagScriptStore()
         self.initialize_task = None
+        self.usage_flush_task = None
+        self.backfill_task = None
         self.dot_parameter: bool = None
         self.async_enabled: bool = None
+        self.usage_flush_interval: int = None
+        self.search_workers: int = 1
+        self.eager_cache_guilds: int = 0
+        self._usage_queue: Set[Tag] = set()
+        self._cached_guilds: Set[int] = set()
+        self._global_tags_cached = False
+        self._guild_cache_locks: Dict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._guild_activity: Counter = Counter()
+        self._storage_ready = asyncio.Event()
         self.initialize_task = self.create_task(self.initialize())
 
         self.session = aiohttp.ClientSession()
@@ -114,20 +167,88 @@ class Tags(
         self.bot.remove_dev_env_value("tags")
         if self.initialize_task:
             self.initialize_task.cancel()
+        if self.usage_flush_task:
+            self.usage_flush_task.cancel()
+        if self.backfill_task:
+            self.backfill_task.cancel()
+        await self.flush_tag_usage()
+        await self.save_active_guilds()
         await self.session.close()
         await super().cog_unload()
 
     async def red_delete_data_for_user(self, *, requester: str, user_id: int):
         if requester not in ("discord_deleted_user", "user"):
             return
-        guilds_data = await self.config.all_guilds()
-        for guild_id, data in guilds_data.items():
-            guild = self.bot.get_guild(guild_id)
-            if guild and data["tags"]:
-                for name, tag in data["tags"].items():
-                    if str(user_id) in str(tag["author_id"]):
-                        async with self.config.guild(guild).tags() as t:
-                            del t[name]
+        await self._storage_ready.wait()
+        author_config = self.get_author_config(user_id)
+        deleted = []
+        async with author_config.tags.get_lock():
+            for scope, name in await author_config.tags():
+                tag_config = self.config.custom("Tag", scope, name)
+                tag_data = await tag_config.all()
+                # an import can overwrite a tag with one by a different author
+                if (tag_data.get("author_id") or tag_data.get("author")) != user_id:
+                    continue
+                await tag_config.clear()
+                deleted.append((scope, name))
+            await author_config.clear()
+
+        for scope, name in deleted:
+            guild_id = None if scope == GLOBAL_SCOPE else int(scope)
+            cache = self.guild_tag_cache.get(guild_id, {}) if guild_id else self.global_tag_cache
+            if (tag := cache.get(name)) is not None and tag.name == name:
+                tag.remove_from_cache()
+                self.profiler.remove(guild_id, name)
+        if deleted:
+            log.info(
+                "Deleted %s tags across %s scopes for user %s.",
+                len(deleted),
+                len({scope for scope, _ in deleted}),
+                user_id,
+            )
+
+    def get_author_config(self, author_id: int):
+        return self.config.custom("TagAuthor", str(author_id))
+
+    async def index_tag_authors(self, tags: Iterable[Tuple[Optional[int], str, str]]):
+        """Add ``(author_id, scope, name)`` entries to the stored author index."""
+        by_author = defaultdict(list)
+        for author_id, scope, name in tags:
+            if author_id is not None:
+                by_author[author_id].append([scope, name])
+        for author_id, entries in by_author.items():
+            async with self.get_author_config(author_id).tags() as indexed:
+                existing = set(map(tuple, indexed))
+                indexed.extend(entry for entry in entries if tuple(entry) not in existing)
+
+    async def unindex_tag_author(self, author_id: Optional[int], scope: str, name: str):
+        if author_id is None:
+            return
+        async with self.get_author_config(author_id).tags() as indexed:
+            try:
+                indexed.remove([scope, name])
+            except ValueError:
+                pass
+
+    async def build_author_index(self):
+        """Index every stored tag by its author, for tags saved before the index existed."""
+        start = time.perf_counter()
+        all_tags = await self.config.custom("Tag").all()
+        authors = defaultdict(list)
+        for scope, tags in all_tags.items():
+            for name, tag_data in tags.items():
+                if author_id := tag_data.get("author_id") or tag_data.get("author"):
+                    authors[str(author_id)].append([scope, name])
+        del all_tags
+        await self.config.custom("TagAuthor").set(
+            {author_id: {"tags": entries} for author_id, entries in authors.items()}
+        )
+        await self.config.author_index_built.set(True)
+        log.info(
+            "Indexed the tags of %s authors in %.2f seconds.",
+            len(authors),
+            time.perf_counter() - start,
+        )
 
     def task_done_callback(self, task: asyncio.Task):
         try:
@@ -145,61 +266,189 @@ class Tags(
     async def initialize(self):
         data = await self.config.all()
         await self.initialize_interpreter(data)
+        self.usage_flush_interval = data["usage_flush_interval"]
+        self.search_workers = data["search_workers"]
+        self.eager_cache_guilds = data["eager_cache_guilds"]
+        self.slow_tag_threshold = data["slow_tag_threshold"]
+        self.command_block_mode = data["command_block_mode"]
+        CooldownBlock.COOLDOWNS.max_size = data["cooldown_limit"]
+        self.tagscript_store.enabled = data["compact_tagscripts"]
+        self.tagscript_store.max_size = data["tagscript_cache_size"]
+        self.tag_limiter = InvocationLimiter(
+            data["guild_concurrency"], data["global_concurrency"], data["tag_queue_size"]
+        )
+        self.usage_flush_task = self.create_task(self.usage_flush_loop())
 
-        global_tags = data["tags"]
+        try:
+            if data["schema_version"] < 2:
+                await self.migrate_tag_storage()
+            if not data["author_index_built"]:
+                await self.build_author_index()
+        finally:
+            self._storage_ready.set()
+
+        global_tags = await self.config.custom("Tag", GLOBAL_SCOPE).all()
         async for global_tag_name, global_tag_data in AsyncIter(global_tags.items(), steps=50):
             tag = Tag.from_dict(self, global_tag_name, global_tag_data)
             tag.add_to_cache()
-            if "created_at" not in global_tag_data:
-                await tag.update_config()
+        self._global_tags_cached = True
+        log.debug("Built global tag cache.")
+
+        if data["schema_version"] < 3:
+            self.backfill_task = self.create_task(self.backfill_created_at())
+
+        # guild caches are built on first use, except for the most active guilds
+        for guild_id in data["active_guilds"][: self.eager_cache_guilds]:
+            await self.cache_guild(guild_id)
+
+    async def ensure_guild_cached(self, guild: Optional[discord.Guild]):
+        """Build a guild's tag cache if this is the first time its tags are needed."""
+        if guild is not None and guild.id not in self._cached_guilds:
+            await self.cache_guild(guild.id)
+
+    async def cache_guild(self, guild_id: int):
+        await self._storage_ready.wait()
+        async with self._guild_cache_locks[guild_id]:
+            if guild_id in self._cached_guilds:
+                return
+            guild_tags = await self.config.custom("Tag", str(guild_id)).all()
+            path = self.guild_tag_cache[guild_id]
+            async for tag_name, tag_data in AsyncIter(guild_tags.items(), steps=50):
+                if tag_name in path:
+                    # tags added before the guild was cached are already up to date
+                    continue
+                tag = Tag.from_dict(self, tag_name, tag_data, guild_id=guild_id)
+                tag.add_to_cache()
+            self._cached_guilds.add(guild_id)
+        del self._guild_cache_locks[guild_id]
+        log.debug("Built tag cache for guild %s.", guild_id)
+
+    async def save_active_guilds(self):
+        if not self.eager_cache_guilds:
+            return
+        active_guilds = [
+            guild_id for guild_id, _ in self._guild_activity.most_common(self.eager_cache_guilds)
+        ]
+        for guild_id in await self.config.active_guilds():
+            if len(active_guilds) >= self.eager_cache_guilds:
+                break
+            if guild_id not in active_guilds:
+                active_guilds.append(guild_id)
+        await self.config.active_guilds.set(active_guilds)
+
+    async def migrate_tag_storage(self):
+        """
+        Move tags out of the legacy guild and global ``tags`` dicts into the ``Tag`` custom
+        group, which stores one record per tag.
+        """
+        start = time.perf_counter()
+        migrated = 0
+        if global_tags := await self.config.tags():
+            await self._migrate_tag_scope(GLOBAL_SCOPE, global_tags)
+            await self.config.tags.clear()
+            migrated += len(global_tags)
 
         guilds_data = await self.config.all_guilds()
         async for guild_id, guild_data in AsyncIter(guilds_data.items(), steps=100):
-            await self.cache_guild(guild_id, guild_data)
+            if not guild_data["tags"]:
+                continue
+            await self._migrate_tag_scope(str(guild_id), guild_data["tags"])
+            await self.config.guild_from_id(guild_id).tags.clear()
+            migrated += len(guild_data["tags"])
+
+        await self.config.schema_version.set(2)
+        log.info(
+            "Migrated %s tags to per-tag storage in %.2f seconds.",
+            migrated,
+            time.perf_counter() - start,
+        )
 
-        log.debug("Built tag cache.")
+    async def backfill_created_at(self):
+        """
+        Add creation timestamps to legacy tags that were saved without one.
+
+        Each scope that needs it is written once, rather than once per tag.
+        """
+        start = time.perf_counter()
+        all_tags = await self.config.custom("Tag").all()
+        scopes = {}
+        for scope, tags in all_tags.items():
+            if missing := [name for name, data in tags.items() if data.get("created_at") is None]:
+                scopes[scope] = missing
+        del all_tags
+        total = len(scopes)
+        if total:
+            log.info("Backfilling tag creation dates for %s scopes.", total)
+
+        backfilled = 0
+        async for progress, (scope, names) in AsyncIter(enumerate(scopes.items(), 1), steps=10):
+            cache = (
+                self.global_tag_cache
+                if scope == GLOBAL_SCOPE
+                else self.guild_tag_cache.get(int(scope), {})
+            )
+            now = time.time()
+            async with self.config.custom("Tag", scope).all() as tags:
+                for name in names:
+                    if (tag_data := tags.get(name)) is None:
+                        continue
+                    # cached tags already assumed a creation date, so keep it consistent
+                    tag = cache.get(name)
+                    tag_data["created_at"] = tag.created_at.timestamp() if tag else now
+                    backfilled += 1
+            if progress % 100 == 0:
+                log.info("Backfilled tag creation dates for %s/%s scopes.", progress, total)
+
+        await self.config.schema_version.set(3)
+        if total:
+            log.info(
+                "Backfilled %s tag creation dates in %.2f seconds.",
+                backfilled,
+                time.perf_counter() - start,
+            )
 
-    async def cache_guild(self, guild_id: int, guild_data: dict):
-        async for tag_name, tag_data in AsyncIter(guild_data["tags"].items(), steps=50):
-            tag = Tag.from_dict(self, tag_name, tag_data, guild_id=guild_id)
-            tag.add_to_cache()
-            if "created_at" not in tag_data:
-                await tag.update_config()
+    async def _migrate_tag_scope(self, scope: str, legacy_tags: dict):
+        async with self.config.custom("Tag", scope).all() as tags:
+            for name, tag_data in legacy_tags.items():
+                # tags created while the migration was running take priority
+                tags.setdefault(name, tag_data)
+
+    def queue_tag_usage(self, tag: Tag):
+        if tag._real_tag:
+            self._usage_queue.add(tag)
+            if tag.guild_id:
+                self._guild_activity[tag.guild_id] += 1
+
+    async def flush_tag_usage(self):
+        if not self._usage_queue:
+            return
+        pending, self._usage_queue = list(self._usage_queue), set()
+        for index, tag in enumerate(pending):
+            # skip tags that were deleted or replaced since they were queued
+            if tag.cache_path.get(tag.name) is not tag:
+                continue
+            try:
+                await tag.config_path.uses.set(tag.uses)
+            except Exception:
+                self._usage_queue.update(pending[index:])
+                raise
+        log.debug("Flushed usage for %s tags.", len(pending))
+
+    async def usage_flush_loop(self):
+        while True:
+            await asyncio.sleep(self.usage_flush_interval)
+            try:
+                await self.flush_tag_usage()
+            except Exception as error:
+                log.exception("Failed to flush tag usage.", exc_info=error)
+            try:
+                CooldownBlock.COOLDOWNS.prune()
+            except Exception as error:
+                log.exception("Failed to prune tag cooldowns.", exc_info=error)
 
     def search_tag(self, tag_name: str, guild: Optional[discord.Guild] = None) -> List[Tag]:
-        tags = self.get_unique_tags(guild)
-        matches = []
-        for tag in tags:
-            name_score = fuzz.ratio(tag_name.lower(), tag.name.lower())
-
-            if alias_search := process.extractOne(tag_name, tag.aliases, scorer=fuzz.QRatio):
-                alias_score = alias_search[1]
-            else:
-                alias_score = 0
-
-            if tag_name.lower() in tag.tagscript.lower():
-                script_score = 100
-            elif script_search := process.extractOne(
-                tag_name, re.findall(r"\w+", tag.tagscript), scorer=fuzz.QRatio
-            ):
-                script_score = script_search[1]
-            else:
-                script_score = 0
-
-            scores = (name_score, alias_score, script_score)
-            final_score = sum(scores)
-            log.debug(
-                "search: %r | %s NAME: %s ALIAS: %s SCRIPT %s FINAL %s",
-                tag_name,
-                tag.name,
-                name_score,
-                alias_score,
-                script_score,
-                final_score,
-            )
-            if any(score >= 70 for score in scores) or final_score > 180:
-                matches.append((final_score, tag))
-        return [match[1] for match in sorted(matches, key=itemgetter(0), reverse=True)]
+        index = self.search_indexes[guild.id if guild else None]
+        return index.search(tag_name, workers=self.search_workers)
 
     def get_tag(
         self,
@@ -209,6 +458,11 @@ class Tags(
         check_global: bool = True,
         global_priority: bool = False,
     ) -> Optional[Tag]:
+        """
+        Get a tag or alias from the cache.
+
+        A guild's tags are only found after it has been cached with `ensure_guild_cached`.
+        """
         tag = None
         if global_priority and check_global:
             return self.global_tag_cache.get(tag_name)
@@ -218,26 +472,75 @@ class Tags(
             tag = self.global_tag_cache.get(tag_name)
         return tag
 
+    def get_tag_listing(self, guild: Optional[discord.Guild] = None) -> TagListing:
+        return self.tag_listings[guild.id if guild else None]
+
     def get_unique_tags(self, guild: Optional[discord.Guild] = None) -> List[Tag]:
-        path = self.guild_tag_cache[guild.id] if guild else self.global_tag_cache
-        return sorted(set(path.values()), key=lambda t: t.name)
+        return list(self.get_tag_listing(guild))
+
+    def iter_cached_tags(self) -> Iterator[Tag]:
+        for listing in list(self.tag_listings.values()):
+            yield from list(listing)
+
+    def measure_tag_cache(self) -> Dict[str, int]:
+        """Estimate the memory held by cached tags, in bytes."""
+        usage = measure_tags(self.iter_cached_tags())
+        usage["lookup"] = sys.getsizeof(self.global_tag_cache) + sum(
+            map(sys.getsizeof, self.guild_tag_cache.values())
+        )
+        usage["hot"] = self.tagscript_store.memory_usage()
+        usage["search"] = sum(index.memory_usage() for index in list(self.search_indexes.values()))
+        usage["listings"] = sum(
+            listing.memory_usage() for listing in list(self.tag_listings.values())
+        )
+        return usage
+
+    async def get_restricted_actions(self, tagscript: str) -> FrozenSet[str]:
+        """
+        Get the restricted actions a tagscript adds.
+
+        Tagscripts without a block that could add one are found by scanning their blocks, and
+        only the rest are processed. Results are cached until the interpreter is reinitialized.
+        """
+        cache = self.validation_cache
+        # keyed by the tagscript itself, since a hash collision would skip the permission check
+        if (actions := cache.get(tagscript)) is not None:
+            cache.move_to_end(tagscript)
+            return actions
+
+        declarations = None
+        if self.restricted_declarations is not None:
+            coordinates = tuple(node.coordinates for node in build_node_tree(tagscript))
+            declarations = scan_declarations(
+                tagscript, coordinates, dot_parameter=self.dot_parameter
+            )
+        if declarations is not None and declarations.isdisjoint(self.restricted_declarations):
+            actions = frozenset()
+        else:
+            output = self.engine.process(tagscript)
+            if self.async_enabled:
+                output = await output
+            actions = RESTRICTED_ACTIONS.intersection(output.actions)
+
+        cache[tagscript] = actions
+        if len(cache) > VALIDATION_CACHE_SIZE:
+            cache.popitem(last=False)
+        return actions
 
     async def validate_tagscript(self, ctx: commands.Context, tagscript: str):
         length = len(tagscript)
         if length > TAGSCRIPT_LIMIT:
             raise TagCharacterLimitReached(TAGSCRIPT_LIMIT, length)
-        output = self.engine.process(tagscript)
-        if self.async_enabled:
-            output = await output
+        actions = await self.get_restricted_actions(tagscript)
         is_owner = await self.bot.is_owner(ctx.author)
         if is_owner:
             return True
         author_perms = ctx.channel.permissions_for(ctx.author)
-        if output.actions.get("overrides") and not author_perms.manage_guild:
+        if "overrides" in actions and not author_perms.manage_guild:
             raise MissingTagPermissions(
                 "You must have **Manage Server** permissions to use the `override` block."
             )
-        if output.actions.get("allowed_mentions") and not is_owner:
+        if "allowed_mentions" in actions and not is_owner:
             raise MissingTagPermissions(
                 "You must have **Mention Everyone** permissions to use the `allowedmentions` block."
             )
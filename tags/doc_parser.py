@@ -22,98 +22,242 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-# 99% of this comes from RoboDanny
+# Inventory parsing is adapted from RoboDanny
 # https://github.com/Rapptz/RoboDanny/blob/a8513406e08f74f62a4dc8c9989e64fc8a939ced/cogs/api.py#L180
-import io
+import bisect
+import json
+import logging
 import os
 import re
 import zlib
-from typing import Dict
+from collections import defaultdict
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Set
 
+__all__ = (
+    "InventoryParser",
+    "parse_object_inv",
+    "DocIndex",
+    "read_inventory_cache",
+    "write_inventory_cache",
+)
+
+log = logging.getLogger("red.phenom4n4n.tags.doc_parser")
+
+# This code mostly comes from the Sphinx repository.
+ENTRY_RE = re.compile(r"(?x)(.+?)\s+(\S*:\S*)\s+(-?\d+)\s+(\S+)\s+(.*)")
+
+
+class InventoryParser:
+    """
+    Incrementally parses a Sphinx ``objects.inv`` file.
+
+    Data can be fed in chunks as it is downloaded. Decompressed lines are split out of a single
+    bytearray that is trimmed once per chunk, so the whole file is never held in memory.
+    """
+
+    __slots__ = ("url", "result", "_buffer", "_header", "_decompressor")
 
-class SphinxObjectFileReader:
-    # Inspired by Sphinx's InventoryFileReader
     BUFSIZE = 16 * 1024
 
-    def __init__(self, buffer):
-        self.stream = io.BytesIO(buffer)
+    def __init__(self, url: str):
+        self.url = url
+        # key: URL
+        self.result: Dict[str, str] = {}
+        self._buffer = bytearray()
+        self._header: List[str] = []
+        self._decompressor = None
 
-    def readline(self):
-        return self.stream.readline().decode("utf-8")
+    def feed(self, data: bytes):
+        if self._decompressor is None:
+            self._buffer += data
+            if not self._read_header():
+                return
+            data = bytes(self._buffer)
+            self._buffer.clear()
+        self._feed_lines(self._decompressor.decompress(data))
 
-    def skipline(self):
-        self.stream.readline()
+    def close(self) -> Dict[str, str]:
+        if self._decompressor is None:
+            raise RuntimeError("Invalid objects.inv file, missing header.")
+        self._feed_lines(self._decompressor.flush())
+        if self._buffer:
+            self._parse_line(self._buffer.decode("utf-8"))
+            self._buffer.clear()
+        return self.result
 
-    def read_compressed_chunks(self):
-        decompressor = zlib.decompressobj()
-        while True:
-            chunk = self.stream.read(self.BUFSIZE)
-            if len(chunk) == 0:
-                break
-            yield decompressor.decompress(chunk)
-        yield decompressor.flush()
-
-    def read_compressed_lines(self):
-        buf = b""
-        for chunk in self.read_compressed_chunks():
-            buf += chunk
-            pos = buf.find(b"\n")
-            while pos != -1:
-                yield buf[:pos].decode("utf-8")
-                buf = buf[pos + 1 :]
-                pos = buf.find(b"\n")
-
-
-def parse_object_inv(stream: SphinxObjectFileReader, url: str) -> Dict[str, str]:
-    # key: URL
-    result = {}
-
-    # first line is version info
-    inv_version = stream.readline().rstrip()
-
-    if inv_version != "# Sphinx inventory version 2":
-        raise RuntimeError("Invalid objects.inv file version.")
-
-    # next line is "# Project: <name>"
-    # then after that is "# Version: <version>"
-    projname = stream.readline().rstrip()[11:]
-    version = stream.readline().rstrip()[11:]
-
-    # next line says if it's a zlib header
-    line = stream.readline()
-    if "zlib" not in line:
-        raise RuntimeError("Invalid objects.inv file, not z-lib compatible.")
-
-    # This code mostly comes from the Sphinx repository.
-    entry_regex = re.compile(r"(?x)(.+?)\s+(\S*:\S*)\s+(-?\d+)\s+(\S+)\s+(.*)")
-    for line in stream.read_compressed_lines():
-        match = entry_regex.match(line.rstrip())
+    def _read_header(self) -> bool:
+        buffer = self._buffer
+        while len(self._header) < 4:
+            pos = buffer.find(b"\n")
+            if pos == -1:
+                return False
+            self._header.append(buffer[:pos].decode("utf-8").rstrip())
+            del buffer[: pos + 1]
+
+        # first line is version info
+        # next line is "# Project: <name>"
+        # then after that is "# Version: <version>"
+        # and the last line says if it's a zlib header
+        if self._header[0] != "# Sphinx inventory version 2":
+            raise RuntimeError("Invalid objects.inv file version.")
+        if "zlib" not in self._header[3]:
+            raise RuntimeError("Invalid objects.inv file, not z-lib compatible.")
+        self._decompressor = zlib.decompressobj()
+        return True
+
+    def _feed_lines(self, data: bytes):
+        buffer = self._buffer
+        buffer += data
+        start = 0
+        while (pos := buffer.find(b"\n", start)) != -1:
+            self._parse_line(buffer[start:pos].decode("utf-8"))
+            start = pos + 1
+        del buffer[:start]
+
+    def _parse_line(self, line: str):
+        match = ENTRY_RE.match(line.rstrip())
         if not match:
-            continue
+            return
 
         name, directive, _, location, dispname = match.groups()
         domain, _, subdirective = directive.partition(":")
-        if directive == "py:module" and name in result:
+        if directive == "py:module" and name in self.result:
             # From the Sphinx Repository:
             # due to a bug in 1.1 and below,
             # two inventory entries are created
             # for Python modules, and the first
             # one is correct
-            continue
+            return
 
         # Most documentation pages have a label
         if directive == "std:doc":
             subdirective = "label"
 
         if subdirective != "label":
-            continue
+            return
 
         if location.endswith("$"):
             location = location[:-1] + name
 
-        # key = name if dispname == '-' else dispname
-        # prefix = f'{subdirective}:' if domain == 'std' else ''
+        self.result[dispname] = os.path.join(self.url, location)
+
+
+def parse_object_inv(stream: BinaryIO, url: str) -> Dict[str, str]:
+    """Parse an ``objects.inv`` file object, such as a local copy of the inventory."""
+    parser = InventoryParser(url)
+    while chunk := stream.read(InventoryParser.BUFSIZE):
+        parser.feed(chunk)
+    return parser.close()
+
+
+class DocIndex:
+    """
+    Case-insensitive substring search over documentation labels.
+
+    Labels are kept sorted for prefix lookups, and a trigram index narrows substring searches
+    to labels that contain every trigram of the keyword.
+    """
+
+    __slots__ = ("entries", "_names", "_lowered", "_sorted", "_trigrams", "_short")
+
+    def __init__(self, entries: Dict[str, str]):
+        self.entries = entries
+        self._names = list(entries)
+        self._lowered = [name.lower() for name in self._names]
+        self._sorted = sorted((lowered, index) for index, lowered in enumerate(self._lowered))
+        self._trigrams: Dict[str, Set[int]] = defaultdict(set)
+        # labels too short to have a trigram
+        self._short: List[int] = []
+        for index, lowered in enumerate(self._lowered):
+            if len(lowered) < 3:
+                self._short.append(index)
+            for i in range(len(lowered) - 2):
+                self._trigrams[lowered[i : i + 3]].add(index)
+
+    def __repr__(self) -> str:
+        return f"<DocIndex entries={len(self._names)} trigrams={len(self._trigrams)}>"
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def items(self):
+        return self.entries.items()
+
+    def prefixed(self, keyword: str) -> List[int]:
+        keyword = keyword.lower()
+        start = bisect.bisect_left(self._sorted, (keyword, -1))
+        matches = []
+        for lowered, index in self._sorted[start:]:
+            if not lowered.startswith(keyword):
+                break
+            matches.append(index)
+        return matches
+
+    def _candidates(self, keyword: str) -> Set[int]:
+        if len(keyword) < 3:
+            # short keywords are matched against the trigrams themselves
+            candidates = set(self._short)
+            for trigram, indexes in self._trigrams.items():
+                if keyword in trigram:
+                    candidates.update(indexes)
+            return candidates
+
+        trigrams = sorted(
+            (self._trigrams.get(keyword[i : i + 3], set()) for i in range(len(keyword) - 2)),
+            key=len,
+        )
+        candidates = trigrams[0].copy()
+        for indexes in trigrams[1:]:
+            candidates &= indexes
+            if not candidates:
+                break
+        return candidates
+
+    def search(self, keyword: str) -> Dict[str, str]:
+        """Return the labels containing `keyword`, with prefix matches first."""
+        keyword = keyword.lower()
+        if not keyword:
+            return self.entries.copy()
+        prefixed = self.prefixed(keyword)
+        seen = set(prefixed)
+        others = sorted(
+            index
+            for index in self._candidates(keyword)
+            if index not in seen and keyword in self._lowered[index]
+        )
+        names = self._names
+        return {names[index]: self.entries[names[index]] for index in sorted(prefixed) + others}
+
+
+def read_inventory_cache(path: Path) -> Optional[dict]:
+    try:
+        with path.open(encoding="utf-8") as fp:
+            data = json.load(fp)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as error:
+        log.debug("Failed to read the cached docs inventory.", exc_info=error)
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get("entries"), dict):
+        return None
+    return data
 
-        result[dispname] = os.path.join(url, location)
 
-    return result
+def write_inventory_cache(
+    path: Path,
+    url: str,
+    entries: Dict[str, str],
+    *,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+):
+    data = {"url": url, "etag": etag, "last_modified": last_modified, "entries": entries}
+    temp = path.with_suffix(".tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with temp.open("w", encoding="utf-8") as fp:
+            json.dump(data, fp)
+        os.replace(temp, path)
+    except OSError as error:
+        log.warning("Failed to cache the docs inventory.", exc_info=error)
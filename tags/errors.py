@@ -35,6 +35,7 @@ __all__ = (
     "BlacklistCheckFailure",
     "TagFeedbackError",
     "TagAliasError",
+    "TagTimeoutError",
 )
 
 
@@ -73,6 +74,15 @@ class TagAliasError(TagFeedbackError):
     """Raised to provide feedback if an error occurs while adding/removing a tag alias."""
 
 
+class TagTimeoutError(TagFeedbackError):
+    """Raised when a tag takes longer than the interpreter deadline to process."""
+
+    def __init__(self, tag_name: str, timeout: float):
+        self.tag_name = tag_name
+        self.timeout = timeout
+        super().__init__(f"`{tag_name}` took longer than {timeout:g} seconds to process.")
+
+
 class BlockCompileError(TagError):
     """Raised when a block fails to compile."""
 
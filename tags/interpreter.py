@@ -0,0 +1,209 @@
+"""
+MIT License
+
+Copyright (c) 2020-present phenom4n4n
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from typing import FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import TagScriptEngine as tse
+from TagScriptEngine.interpreter import AdapterDict, Node, build_node_tree
+
+__all__ = (
+    "ParsedTagScript",
+    "ParseCache",
+    "Interpreter",
+    "AsyncInterpreter",
+    "RESTRICTED_ACTIONS",
+    "get_restricted_declarations",
+    "scan_declarations",
+)
+
+Coordinates = Tuple[Tuple[int, int], ...]
+
+# actions that need extra permissions to be added to a tag
+RESTRICTED_ACTIONS = frozenset({"overrides", "allowed_mentions"})
+RESTRICTED_DECLARATIONS = frozenset(tse.OverrideBlock.ACCEPTED_NAMES + ("allowedmentions",))
+
+
+class ParsedTagScript:
+    """The lexed form of a tagscript, reusable across invocations."""
+
+    __slots__ = ("key", "coordinates")
+
+    def __init__(self, key: Tuple[int, int], coordinates: Coordinates):
+        self.key = key
+        self.coordinates = coordinates
+
+    def __repr__(self) -> str:
+        return f"<ParsedTagScript key={self.key!r} nodes={len(self.coordinates)}>"
+
+    @classmethod
+    def from_tagscript(cls, key: Tuple[int, int], tagscript: str):
+        return cls(key, tuple(node.coordinates for node in build_node_tree(tagscript)))
+
+    def build_nodes(self) -> List[Node]:
+        # nodes are mutated while solving, so each run needs fresh ones
+        return [Node(coordinates) for coordinates in self.coordinates]
+
+
+class ParseCache:
+    """
+    Tracks the parsed tagscripts stored on tags.
+
+    Entries are keyed by a hash of the tagscript and the interpreter's block set, so
+    editing a tag or changing the blocks makes stale entries miss.
+    """
+
+    __slots__ = ("block_key", "hits", "misses")
+
+    def __init__(self):
+        self.block_key: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __repr__(self) -> str:
+        return f"<ParseCache hits={self.hits} misses={self.misses}>"
+
+    def set_blocks(self, blocks: List[tse.Block]):
+        self.block_key = hash(tuple(type(block) for block in blocks))
+
+    def get(self, tagscript: str, parsed: Optional[ParsedTagScript]) -> ParsedTagScript:
+        key = (hash(tagscript), self.block_key)
+        if parsed is not None and parsed.key == key:
+            self.hits += 1
+            return parsed
+        self.misses += 1
+        return ParsedTagScript.from_tagscript(key, tagscript)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class Interpreter(tse.Interpreter):
+    """A TagScript interpreter that can reuse a `ParsedTagScript` instead of lexing."""
+
+    __slots__ = ()
+
+    def process(
+        self,
+        message: str,
+        seed_variables: AdapterDict = None,
+        *,
+        charlimit: Optional[int] = None,
+        dot_parameter: bool = False,
+        parsed: Optional[ParsedTagScript] = None,
+        **kwargs,
+    ) -> tse.Response:
+        response = tse.Response(variables=seed_variables, extra_kwargs=kwargs)
+        node_ordered_list = parsed.build_nodes() if parsed else build_node_tree(message)
+        try:
+            output = self._solve(
+                message,
+                node_ordered_list,
+                response,
+                charlimit=charlimit,
+                dot_parameter=dot_parameter,
+            )
+        except tse.TagScriptError:
+            raise
+        except Exception as error:
+            raise tse.ProcessError(error, response, self) from error
+        return self._return_response(response, output)
+
+
+class AsyncInterpreter(tse.AsyncInterpreter):
+    """An asynchronous `Interpreter`."""
+
+    __slots__ = ()
+
+    async def process(
+        self,
+        message: str,
+        seed_variables: AdapterDict = None,
+        *,
+        charlimit: Optional[int] = None,
+        dot_parameter: bool = False,
+        parsed: Optional[ParsedTagScript] = None,
+        **kwargs,
+    ) -> tse.Response:
+        response = tse.Response(variables=seed_variables, extra_kwargs=kwargs)
+        node_ordered_list = parsed.build_nodes() if parsed else build_node_tree(message)
+        try:
+            output = await self._solve(
+                message,
+                node_ordered_list,
+                response,
+                charlimit=charlimit,
+                dot_parameter=dot_parameter,
+            )
+        except tse.TagScriptError:
+            raise
+        except Exception as error:
+            raise tse.ProcessError(error, response, self) from error
+        return self._return_response(response, output)
+
+
+def get_restricted_declarations(custom_blocks: Iterable[tse.Block]) -> Optional[FrozenSet[str]]:
+    """
+    Get the block declarations that could add restricted actions.
+
+    Custom blocks can add any action, so their names are included. If a custom block decides
+    which declarations it accepts itself, there's no way to know its names and None is returned.
+    """
+    declarations = set(RESTRICTED_DECLARATIONS)
+    default_will_accept = tse.Block.will_accept.__func__
+    for block in custom_blocks:
+        if getattr(type(block).will_accept, "__func__", None) is not default_will_accept:
+            return None
+        declarations.update(name.lower() for name in block.ACCEPTED_NAMES)
+    return frozenset(declarations)
+
+
+def scan_declarations(
+    tagscript: str, coordinates: Coordinates, *, dot_parameter: bool = False
+) -> Optional[Set[str]]:
+    """
+    Statically find the declarations of a tagscript's blocks.
+
+    Returns None if a block starts inside another block's declaration, as the outer declaration
+    is then only known at runtime.
+    """
+    declarations = set()
+    parameter_start = "." if dot_parameter else "("
+    # (end, end of the declaration) of each enclosing block
+    enclosing: List[Tuple[int, int]] = []
+    for start, end in sorted(coordinates):
+        while enclosing and enclosing[-1][0] < start:
+            enclosing.pop()
+        if enclosing and start <= enclosing[-1][1]:
+            return None
+
+        text = tagscript[start + 1 : end]
+        length = len(text)
+        for separator in (":", parameter_start):
+            if (index := text.find(separator)) != -1 and index < length:
+                length = index
+        declarations.add(text[:length].lower())
+        enclosing.append((end, start + 1 + length))
+    return declarations
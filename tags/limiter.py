@@ -0,0 +1,158 @@
+"""
+MIT License
+
+Copyright (c) 2020-present phenom4n4n
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import asyncio
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+__all__ = ("InvocationLimiter", "LimiterBusy", "QueueFull", "QueueTimeout")
+
+
+class LimiterBusy(Exception):
+    """Base class for tag invocations the limiter turned away."""
+
+
+class QueueFull(LimiterBusy):
+    """Raised when a guild already has the maximum number of tag invocations waiting."""
+
+
+class QueueTimeout(LimiterBusy):
+    """Raised when a tag invocation waited longer than the queue timeout for a slot."""
+
+
+class InvocationLimiter:
+    """
+    Limits how many tags can be processed at once, per guild and across the bot.
+
+    Invocations over a guild's limit wait in a queue of at most `queue_size`, and any beyond that
+    are rejected, so one busy guild can't hold every global slot. Invocations that wait longer
+    than `queue_timeout` seconds for a slot are rejected as well.
+    """
+
+    __slots__ = (
+        "guild_limit",
+        "global_limit",
+        "queue_size",
+        "queue_timeout",
+        "_global",
+        "_guilds",
+        "_holders",
+        "waiting",
+        "active",
+        "peak_waiting",
+        "rejected",
+        "completed",
+    )
+
+    def __init__(
+        self,
+        guild_limit: int = 5,
+        global_limit: int = 50,
+        queue_size: int = 20,
+        queue_timeout: float = 15.0,
+    ):
+        self.guild_limit = guild_limit
+        self.global_limit = global_limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._global = asyncio.Semaphore(global_limit)
+        self._guilds: Dict[Optional[int], asyncio.Semaphore] = {}
+        self._holders: Counter = Counter()
+        self.waiting: Counter = Counter()
+        self.active: Counter = Counter()
+        self.peak_waiting: int = 0
+        self.rejected: Counter = Counter()
+        self.completed: int = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"<InvocationLimiter active={sum(self.active.values())} "
+            f"waiting={sum(self.waiting.values())} rejected={sum(self.rejected.values())}>"
+        )
+
+    def _get_semaphore(self, guild_id: Optional[int]) -> asyncio.Semaphore:
+        try:
+            return self._guilds[guild_id]
+        except KeyError:
+            semaphore = self._guilds[guild_id] = asyncio.Semaphore(self.guild_limit)
+            return semaphore
+
+    def _release_guild(self, guild_id: Optional[int]):
+        self._holders[guild_id] -= 1
+        if self._holders[guild_id] <= 0:
+            # no one is using or waiting on the semaphore, so it can be recreated later
+            del self._holders[guild_id]
+            del self._guilds[guild_id]
+
+    @asynccontextmanager
+    async def acquire(self, guild_id: Optional[int]) -> AsyncIterator[None]:
+        semaphore = self._get_semaphore(guild_id)
+        if semaphore.locked() and self.waiting[guild_id] >= self.queue_size:
+            self.rejected[guild_id] += 1
+            raise QueueFull(guild_id)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.queue_timeout
+        self._holders[guild_id] += 1
+        self.waiting[guild_id] += 1
+        self.peak_waiting = max(self.peak_waiting, sum(self.waiting.values()))
+        try:
+            await self._wait_for(semaphore, guild_id, deadline - loop.time())
+        except BaseException:
+            self._release_guild(guild_id)
+            raise
+        finally:
+            self.waiting[guild_id] -= 1
+            if not self.waiting[guild_id]:
+                del self.waiting[guild_id]
+
+        try:
+            await self._wait_for(self._global, guild_id, deadline - loop.time())
+            try:
+                self.active[guild_id] += 1
+                try:
+                    yield
+                finally:
+                    self.active[guild_id] -= 1
+                    if not self.active[guild_id]:
+                        del self.active[guild_id]
+                    self.completed += 1
+            finally:
+                self._global.release()
+        finally:
+            semaphore.release()
+            self._release_guild(guild_id)
+
+    async def _wait_for(
+        self, semaphore: asyncio.Semaphore, guild_id: Optional[int], timeout: float
+    ):
+        if not semaphore.locked():
+            await semaphore.acquire()
+            return
+        try:
+            await asyncio.wait_for(semaphore.acquire(), max(timeout, 0))
+        except asyncio.TimeoutError:
+            self.rejected[guild_id] += 1
+            raise QueueTimeout(guild_id) from None
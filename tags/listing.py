@@ -0,0 +1,120 @@
+"""
+MIT License
+
+Copyright (c) 2020-present phenom4n4n
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import sys
+from bisect import bisect_left, insort
+from collections.abc import Sequence
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    from .objects import Tag
+
+__all__ = ("TagListing",)
+
+
+class TagListing(Sequence):
+    """
+    The unique tags in a scope, kept sorted by name.
+
+    A second index orders the tags by uses so usage stats can be paged without sorting.
+    """
+
+    __slots__ = ("_names", "_tags", "_usage", "_indexed", "alias_count")
+
+    def __init__(self):
+        self._names: List[str] = []
+        self._tags: Dict[str, "Tag"] = {}
+        self._usage: List[Tuple[int, str]] = []
+        self._indexed: Dict[str, Tuple[int, int]] = {}
+        self.alias_count: int = 0
+
+    def __repr__(self) -> str:
+        return f"<TagListing tags={len(self)} aliases={self.alias_count}>"
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._tags[name] for name in self._names[index]]
+        return self._tags[self._names[index]]
+
+    def __contains__(self, tag: "Tag") -> bool:
+        return self._tags.get(tag.name) is tag
+
+    def add(self, tag: "Tag"):
+        if existing := self._tags.get(tag.name):
+            self.remove(existing)
+        insort(self._names, tag.name)
+        self._tags[tag.name] = tag
+        insort(self._usage, (-tag.uses, tag.name))
+        self._indexed[tag.name] = (tag.uses, len(tag.aliases))
+        self.alias_count += len(tag.aliases)
+
+    def remove(self, tag: "Tag"):
+        if tag not in self:
+            return
+        del self._tags[tag.name]
+        del self._names[bisect_left(self._names, tag.name)]
+        uses, alias_count = self._indexed.pop(tag.name)
+        del self._usage[bisect_left(self._usage, (-uses, tag.name))]
+        self.alias_count -= alias_count
+
+    def update(self, tag: "Tag"):
+        """Reindex a tag after its uses or aliases change."""
+        if tag not in self:
+            return
+        uses, alias_count = self._indexed[tag.name]
+        if uses != tag.uses:
+            del self._usage[bisect_left(self._usage, (-uses, tag.name))]
+            insort(self._usage, (-tag.uses, tag.name))
+        self.alias_count += len(tag.aliases) - alias_count
+        self._indexed[tag.name] = (tag.uses, len(tag.aliases))
+
+    def memory_usage(self) -> int:
+        """Estimate the bytes used by the sorted indexes, not counting the tags themselves."""
+        size = sum(map(sys.getsizeof, (self._names, self._tags, self._usage, self._indexed)))
+        size += sum(map(sys.getsizeof, self._usage))
+        size += sum(map(sys.getsizeof, self._indexed.values()))
+        return size
+
+    def by_usage(self) -> "TagUsageView":
+        """Get the tags ordered by uses, then by name."""
+        return TagUsageView(self)
+
+
+class TagUsageView(Sequence):
+    __slots__ = ("_listing",)
+
+    def __init__(self, listing: TagListing):
+        self._listing = listing
+
+    def __len__(self) -> int:
+        return len(self._listing)
+
+    def __getitem__(self, index):
+        tags = self._listing._tags
+        if isinstance(index, slice):
+            return [tags[name] for _, name in self._listing._usage[index]]
+        return tags[self._listing._usage[index][1]]
@@ -22,17 +22,20 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+import asyncio
 import logging
 import re
 import time
 import types
-from collections import Counter
-from typing import Dict, List, Optional, Union
+import zlib
+from typing import Dict, List, Optional, Sequence, Union
 from urllib.parse import quote_plus
 
+import aiohttp
 import discord
 import TagScriptEngine as tse
 from redbot.core import commands
+from redbot.core.data_manager import cog_data_path
 from redbot.core.utils.chat_formatting import box, humanize_list, inline, pagify
 from tabulate import tabulate
 
@@ -45,18 +48,18 @@ from ..converters import (
     TagName,
     TagScriptConverter,
 )
-from ..doc_parser import SphinxObjectFileReader, parse_object_inv
+from ..doc_parser import DocIndex, InventoryParser, read_inventory_cache, write_inventory_cache
 from ..errors import TagFeedbackError
-from ..objects import Tag
-from ..utils import chunks, menu
-from ..views import ConfirmationView
+from ..objects import TAG_GLOBAL_LIMIT, TAG_GUILD_LIMIT, Tag
+from ..utils import menu
+from ..views import ConfirmationView, LazyPageSource, PaginatedView
 
-TAG_GUILD_LIMIT = 250
-TAG_GLOBAL_LIMIT = 250
+TAG_LIST_PAGE_SIZE = 20
 
 TAG_RE = re.compile(r"(?i)(\[p\])?\btag'?s?\b")
 
 DOCS_URL = "https://phen-cogs.readthedocs.io/en/latest"
+DOCS_INVENTORY_URL = f"{DOCS_URL}/objects.inv"
 
 log = logging.getLogger("red.phenom4n4n.tags.commands")
 
@@ -89,40 +92,47 @@ def copy_doc(original: Union[commands.Command, types.FunctionType]):
 
 class Commands(MixinMeta):
     def __init__(self):
-        self.docs = None
+        self.docs: Optional[DocIndex] = None
+        self.docs_cache_path = cog_data_path(self) / "docs.json"
+        self._docs_lock = asyncio.Lock()
         super().__init__()
 
     @staticmethod
-    def generate_tag_list(tags: List[Tag]) -> Dict[str, List[str]]:
-        aliases = []
-        description = []
-
-        for tag in tags:
-            aliases.extend(tag.aliases)
-            tagscript = tag.tagscript.replace("\n", " ")
-            if len(tagscript) > 23:
-                tagscript = tagscript[:20] + "..."
-            tagscript = discord.utils.escape_markdown(tagscript)
-            description.append(f"`{tag}` - {tagscript}")
-
-        return {"aliases": aliases, "description": description}
+    def format_tag_line(tag: Tag) -> str:
+        tagscript = tag.peek_tagscript().replace("\n", " ")
+        if len(tagscript) > 23:
+            tagscript = tagscript[:20] + "..."
+        tagscript = discord.utils.escape_markdown(tagscript)
+        return f"`{tag}` - {tagscript}"
+
+    async def show_tag_list(
+        self,
+        ctx: commands.Context,
+        tags: Sequence[Tag],
+        name: str,
+        icon_url: str,
+        *,
+        alias_count: Optional[int] = None,
+    ):
+        """
+        Paginate a sequence of tags.
 
-    @staticmethod
-    async def show_tag_list(ctx, data: Dict[str, List[str]], name: str, icon_url: str):
-        aliases = data["aliases"]
-        description = data["description"]
+        Only the page being shown is formatted, so large listings aren't rendered up front.
+        """
+        if alias_count is None:
+            alias_count = sum(len(tag.aliases) for tag in tags)
         e = discord.Embed(color=await ctx.embed_color())
         e.set_author(name=name, icon_url=icon_url)
+        footer = f"{len(tags)} tags | {alias_count} aliases"
 
-        embeds = []
-        pages = list(pagify("\n".join(description)))
-        footer = f"{len(description)} tags | {len(aliases)} aliases"
-        for index, page in enumerate(pages, 1):
+        def format_page(page_number: int, page: List[Tag]) -> discord.Embed:
             embed = e.copy()
-            embed.description = page
-            embed.set_footer(text=f"{index}/{len(pages)} | {footer}")
-            embeds.append(embed)
-        await menu(ctx, embeds)
+            embed.description = "\n".join(self.format_tag_line(tag) for tag in page)
+            embed.set_footer(text=f"{page_number + 1}/{source.get_max_pages()} | {footer}")
+            return embed
+
+        source = LazyPageSource(tags, format_page, per_page=TAG_LIST_PAGE_SIZE)
+        await PaginatedView(source).send_initial_message(ctx)
 
     @commands.command(usage="<tag_name> [args]")
     async def invoketag(
@@ -164,6 +174,7 @@ class Commands(MixinMeta):
         `[p]tags`
         """
         guild = ctx.guild
+        await self.ensure_guild_cached(guild)
         path = self.guild_tag_cache[guild.id] if guild else self.global_tag_cache
         if not path:
             return await ctx.send(
@@ -186,7 +197,7 @@ class Commands(MixinMeta):
         await menu(ctx, embeds)
 
     def validate_tag_count(self, guild: discord.Guild):
-        tag_count = len(self.get_unique_tags(guild))
+        tag_count = len(self.get_tag_listing(guild))
         if guild:
             if tag_count >= TAG_GUILD_LIMIT:
                 raise TagFeedbackError(
@@ -207,6 +218,7 @@ class Commands(MixinMeta):
             tag = self.get_tag(None, tag_name, global_priority=True)
         else:
             guild = ctx.guild
+            await self.ensure_guild_cached(guild)
             tag = self.get_tag(guild, tag_name, check_global=False)
             kwargs["guild_id"] = guild.id
         self.validate_tag_count(guild)
@@ -377,11 +389,11 @@ class Commands(MixinMeta):
         **Example:**
         `[p]tag search notsupport`
         """
+        await self.ensure_guild_cached(ctx.guild)
         tags = self.search_tag(keyword, guild=ctx.guild)
         if not tags:
             return await ctx.send(f"There are no close matches for '{keyword}'.")
-        data = self.generate_tag_list(tags)
-        await self.show_tag_list(ctx, data, "Search Results", ctx.guild.icon.url)
+        await self.show_tag_list(ctx, tags, "Search Results", ctx.guild.icon.url)
 
     @tag.command("list")
     async def tag_list(self, ctx: commands.Context):
@@ -393,37 +405,78 @@ class Commands(MixinMeta):
         **Example:**
         `[p]tag list`
         """
-        tags = self.get_unique_tags(ctx.guild)
-        if not tags:
+        await self.ensure_guild_cached(ctx.guild)
+        listing = self.get_tag_listing(ctx.guild)
+        if not listing:
             return await ctx.send("There are no stored tags on this server.")
-        data = self.generate_tag_list(tags)
-        await self.show_tag_list(ctx, data, "Stored Tags", ctx.guild.icon.url)
+        await self.show_tag_list(
+            ctx, listing, "Stored Tags", ctx.guild.icon.url, alias_count=listing.alias_count
+        )
 
     async def doc_fetch(self):
-        async with self.session.get(f"{DOCS_URL}/objects.inv") as response:
-            inv = SphinxObjectFileReader(await response.read())
-        self.docs = parse_object_inv(inv, DOCS_URL)
+        """
+        Load the docs inventory, revalidating the cached copy with the server.
+
+        The cached copy is used if the docs haven't changed or can't be reached.
+        """
+        cached = read_inventory_cache(self.docs_cache_path)
+        if cached and cached.get("url") != DOCS_URL:
+            cached = None
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        try:
+            async with self.session.get(DOCS_INVENTORY_URL, headers=headers) as response:
+                if cached and response.status == 304:
+                    entries = cached["entries"]
+                else:
+                    response.raise_for_status()
+                    parser = InventoryParser(DOCS_URL)
+                    async for chunk in response.content.iter_chunked(InventoryParser.BUFSIZE):
+                        parser.feed(chunk)
+                    entries = parser.close()
+                    write_inventory_cache(
+                        self.docs_cache_path,
+                        DOCS_URL,
+                        entries,
+                        etag=response.headers.get("ETag"),
+                        last_modified=response.headers.get("Last-Modified"),
+                    )
+        except (aiohttp.ClientError, asyncio.TimeoutError, RuntimeError, zlib.error) as error:
+            if not cached:
+                raise
+            log.warning(
+                "Failed to fetch the docs inventory, using the cached copy.", exc_info=error
+            )
+            entries = cached["entries"]
+        self.docs = DocIndex(entries)
 
     async def doc_search(self, keyword: str) -> Dict[str, str]:
-        keyword = keyword.lower()
-        if not self.docs:
-            await self.doc_fetch()
-        return {key: value for key, value in self.docs.items() if keyword in key.lower()}
+        async with self._docs_lock:
+            if self.docs is None:
+                await self.doc_fetch()
+        return self.docs.search(keyword)
 
     async def show_tag_usage(self, ctx: commands.Context, guild: discord.Guild = None):
-        tags = self.get_unique_tags(guild)
-        if not tags:
+        await self.ensure_guild_cached(guild)
+        listing = self.get_tag_listing(guild)
+        if not listing:
             message = "This server has no tags" if guild else "There are no global tags."
             return await ctx.send(message)
-        counter = Counter({tag.name: tag.uses for tag in tags})
         e = discord.Embed(title="Tag Stats", color=await ctx.embed_color())
-        embeds = []
-        for usage_data in chunks(counter.most_common(), 10):
-            usage_chart = box(tabulate(usage_data, headers=("Tag", "Uses")), "prolog")
+
+        def format_page(page_number: int, page: List[Tag]) -> discord.Embed:
+            usage_data = [(tag.name, tag.uses) for tag in page]
             embed = e.copy()
-            embed.description = usage_chart
-            embeds.append(embed)
-        await menu(ctx, embeds)
+            embed.description = box(tabulate(usage_data, headers=("Tag", "Uses")), "prolog")
+            return embed
+
+        source = LazyPageSource(listing.by_usage(), format_page, per_page=10)
+        await PaginatedView(source).send_initial_message(ctx)
 
     @tag.command("usage", aliases=["stats"])
     async def tag_usage(self, ctx: commands.Context):
@@ -605,17 +658,17 @@ class Commands(MixinMeta):
         tags = self.search_tag(keyword)
         if not tags:
             return await ctx.send(f"There are no close matches for '{keyword}'.")
-        data = self.generate_tag_list(tags)
-        await self.show_tag_list(ctx, data, "Search Results", ctx.me.avatar.url)
+        await self.show_tag_list(ctx, tags, "Search Results", ctx.me.avatar.url)
 
     @tag_global.command("list")
     @copy_doc(tag_list)
     async def tag_global_list(self, ctx: commands.Context):
-        tags = self.get_unique_tags()
-        if not tags:
+        listing = self.get_tag_listing()
+        if not listing:
             return await ctx.send("There are no global tags.")
-        data = self.generate_tag_list(tags)
-        await self.show_tag_list(ctx, data, "Global Tags", ctx.me.avatar.url)
+        await self.show_tag_list(
+            ctx, listing, "Global Tags", ctx.me.avatar.url, alias_count=listing.alias_count
+        )
 
     @tag_global.command("usage", aliases=["stats"])
     @copy_doc(tag_usage)
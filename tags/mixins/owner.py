@@ -21,44 +21,88 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
+
+import gzip
 import inspect
 import logging
+import shutil
+import tempfile
 import textwrap
+import time
 import traceback
-from typing import List
+from collections import Counter
+from typing import Dict, List, Literal, Type
 
 import discord
 import TagScriptEngine as tse
+from discord.utils import DEFAULT_FILE_SIZE_LIMIT_BYTES
 from redbot.core import Config, commands
+from redbot.core.data_manager import cog_data_path
 from redbot.core.dev_commands import Dev, async_compile, cleanup_code, get_pages
 from redbot.core.utils import AsyncIter
+from redbot.core.utils.chat_formatting import humanize_number, pagify
+from tabulate import tabulate
 
 from ..abc import MixinMeta
-from ..blocks import ContextVariableBlock, ConverterBlock
-from ..errors import BlockCompileError
-from ..objects import Tag
+from ..block_cache import BlockCodeCache, source_hash
+from ..blocks import ContextVariableBlock, ConverterBlock, CooldownBlock
+from ..errors import BlockCompileError, TagError
+from ..limiter import InvocationLimiter
+from ..objects import GLOBAL_SCOPE, TAG_GLOBAL_LIMIT, TAG_GUILD_LIMIT, Tag
+from ..search import MULTI_WORKER_SUPPORTED
+from ..transfer import TransferReadError, dump_tag, group_lines, iter_lines
 from ..utils import menu
 from ..views import ConfirmationView
 
 log = logging.getLogger("red.phenom4n4n.tags.owner")
 
+IMPORT_CHUNK_SIZE = 64 * 1024
+
 
 class OwnerCommands(MixinMeta):
     def __init__(self):
         self.custom_command_engine = tse.Interpreter([ContextVariableBlock(), ConverterBlock()])
+        self.block_cache: Dict[str, Type[tse.Block]] = {}
+        self.block_code_cache = BlockCodeCache(cog_data_path(self) / "blocks")
+        self.block_compile_time: float = 0.0
         super().__init__()
 
     async def compile_blocks(self, data: dict = None) -> List[tse.Block]:
         blocks = []
         blocks_data = data["blocks"] if data else await self.config.blocks()
+        start = time.perf_counter()
+        memory_hits = 0
+        disk_hits = self.block_code_cache.hits
+        keys = []
         for block_code in blocks_data.values():
+            key = source_hash(block_code)
+            memory_hits += key in self.block_cache
             block = self.compile_block(block_code)
             blocks.append(block)
+            keys.append(key)
+        # drop blocks that were removed or replaced since they were compiled
+        self.block_cache = {key: self.block_cache[key] for key in keys}
+        self.block_code_cache.prune(keys)
+        self.block_compile_time = time.perf_counter() - start
+        if blocks:
+            log.info(
+                "Loaded %s custom blocks in %.2f ms (%s from memory, %s from disk).",
+                len(blocks),
+                self.block_compile_time * 1000,
+                memory_hits,
+                self.block_code_cache.hits - disk_hits,
+            )
         return blocks
 
     def compile_block(self, code: str) -> tse.Block:
-        to_compile = "def func():\n%s" % textwrap.indent(code, "  ")
-        compiled = async_compile(to_compile, "<string>", "exec")
+        key = source_hash(code)
+        if block := self.block_cache.get(key):
+            return block
+        compiled = self.block_code_cache.get(key)
+        from_disk = compiled is not None
+        if not from_disk:
+            to_compile = "def func():\n%s" % textwrap.indent(code, "  ")
+            compiled = async_compile(to_compile, "<string>", "exec")
         env = globals().copy()
         env["bot"] = self.bot
         env["tags"] = self
@@ -67,6 +111,10 @@ class OwnerCommands(MixinMeta):
         if not (inspect.isclass(result) and issubclass(result, tse.Block)):
             raise BlockCompileError(f"code must return a {tse.Block}, not {type(result)}")
         log.debug("compiled block, result: %r", result)
+        # only blocks that compiled to a valid block class are cached
+        if not from_disk:
+            self.block_code_cache.set(key, compiled)
+        self.block_cache[key] = result
         return result
 
     @staticmethod
@@ -88,7 +136,22 @@ class OwnerCommands(MixinMeta):
         description = [
             f"**AsyncInterpreter**: `{data['async_enabled']}`",
             f"**Dot Parameter Parsing**: `{data['dot_parameter']}`",
-            f"**Custom Blocks**: `{len(data['blocks'])}`",
+            f"**Custom Blocks**: `{len(data['blocks'])}` "
+            f"(loaded in `{self.block_compile_time * 1000:.2f}` ms)",
+            f"**Usage Flush Interval**: `{data['usage_flush_interval']}` seconds",
+            f"**Search Workers**: `{data['search_workers']}`",
+            f"**Eagerly Cached Servers**: `{data['eager_cache_guilds']}`",
+            f"**Interpreter Threads**: `{data['interpreter_threads']}`",
+            f"**Interpreter Timeout**: `{data['interpreter_timeout']:g}` seconds",
+            f"**Slow Tag Threshold**: `{data['slow_tag_threshold']}` ms",
+            f"**Command Block Mode**: `{data['command_block_mode']}`",
+            f"**Tag Concurrency**: `{data['guild_concurrency']}` per server, "
+            f"`{data['global_concurrency']}` total, `{data['tag_queue_size']}` queued per server",
+            f"**Parse Cache**: `{self.parse_cache.hits}` hits, `{self.parse_cache.misses}` "
+            f"misses (`{self.parse_cache.hit_rate:.0%}`)",
+            f"**Check Cache**: `{self.check_cache.hits}` hits, `{self.check_cache.misses}` misses",
+            f"**Compact TagScript Storage**: `{data['compact_tagscripts']}` "
+            f"(`{data['tagscript_cache_size']}` kept decompressed)",
         ]
         embed = discord.Embed(
             title="Tags Settings",
@@ -186,6 +249,300 @@ class OwnerCommands(MixinMeta):
         asynchronous = "asynchronous" if target_state else "synchronous"
         await ctx.send(f"The TagScript interpreter is now {asynchronous}.")
 
+    @tagsettings.command("threads")
+    async def tagsettings_threads(self, ctx: commands.Context, threads: int):
+        """
+        Set how many worker threads process tags.
+
+        With workers, the synchronous interpreter runs off the event loop, so slow tags don't stall
+        the bot, and tags taking longer than `[p]tagsettings timeout` fail with an error.
+        Use `0` to process tags on the event loop. This has no effect on the async interpreter.
+        """
+        if not 0 <= threads <= 32:
+            return await ctx.send("The thread count must be between 0 and 32.")
+        await self.config.interpreter_threads.set(threads)
+        self.set_interpreter_threads(threads)
+        if threads:
+            await ctx.send(f"Tags will now be processed by `{threads}` worker thread(s).")
+        else:
+            await ctx.send("Tags will now be processed on the event loop.")
+
+    @tagsettings.command("timeout")
+    async def tagsettings_timeout(self, ctx: commands.Context, seconds: float):
+        """
+        Set how long a tag can take to process on a worker thread.
+
+        Tags that exceed the deadline send an error and are logged. The worker can't be
+        interrupted, so it finishes the tag in the background and its output is discarded.
+        """
+        if not 0.5 <= seconds <= 120:
+            return await ctx.send("The timeout must be between 0.5 and 120 seconds.")
+        await self.config.interpreter_timeout.set(seconds)
+        self.interpreter_timeout = seconds
+        await ctx.send(f"Tags processed on worker threads now time out after {seconds:g} seconds.")
+
+    @tagsettings.command("commandmode")
+    async def tagsettings_commandmode(
+        self, ctx: commands.Context, mode: Literal["ordered", "parallel", "serial"]
+    ):
+        """
+        Set how the commands in a tag's command blocks are run.
+
+        `ordered` (the default) starts them in the order they appear in the tag, and lets them
+        run at the same time.
+        `parallel` starts all of a tag's commands at once.
+        `serial` runs them one at a time, so each command waits for the one before it to finish.
+        """
+        await self.config.command_block_mode.set(mode)
+        self.command_block_mode = mode
+        await ctx.send(f"Command blocks will now run in `{mode}` mode.")
+
+    @tagsettings.command("cooldowns")
+    async def tagsettings_cooldowns(self, ctx: commands.Context, limit: int = None):
+        """
+        View cooldown block storage, or set the maximum number of stored tag cooldowns.
+
+        Tag cooldowns are removed once they expire. When the limit is reached, the least
+        recently used cooldowns are dropped and reset.
+        """
+        store = CooldownBlock.COOLDOWNS
+        if limit is not None:
+            if limit < 100:
+                return await ctx.send("The cooldown limit must be at least 100.")
+            await self.config.cooldown_limit.set(limit)
+            store.max_size = limit
+            store.shrink()
+            return await ctx.send(f"Up to {humanize_number(limit)} tag cooldowns will be stored.")
+        pruned = store.prune()
+        description = [
+            f"**Tag Cooldowns**: `{humanize_number(len(store))}` / "
+            f"`{humanize_number(store.max_size)}`",
+            f"**Buckets**: `{humanize_number(store.bucket_count())}`",
+            f"**Memory Used**: ~`{humanize_number(store.memory_usage() // 1024)}` KiB",
+            f"**Expired Cooldowns Removed**: `{humanize_number(pruned)}`",
+        ]
+        embed = discord.Embed(
+            title="Cooldown Storage",
+            color=await ctx.embed_color(),
+            description="\n".join(description),
+        )
+        await ctx.send(embed=embed)
+
+    @tagsettings.command("compact")
+    async def tagsettings_compact(
+        self, ctx: commands.Context, true_or_false: bool = None, cache_size: int = None
+    ):
+        """
+        Toggle compact tagscript storage.
+
+        In compact mode, cached tagscripts are kept compressed and decompressed when used. The
+        `cache_size` most recently used tagscripts are kept decompressed (1000 by default).
+        Reports the tag cache's memory use before and after the change.
+
+        **Example:**
+        `[p]tagset compact True`
+        `[p]tagset compact True 500`
+        """
+        if cache_size is not None and cache_size < 0:
+            return await ctx.send("The cache size can't be negative.")
+        store = self.tagscript_store
+        target_state = true_or_false if true_or_false is not None else not store.enabled
+        before = sum(self.measure_tag_cache().values())
+
+        await self.config.compact_tagscripts.set(target_state)
+        if cache_size is not None:
+            await self.config.tagscript_cache_size.set(cache_size)
+            store.resize(cache_size)
+        if target_state != store.enabled:
+            store.enabled = target_state
+            store.clear()
+            async for tag in AsyncIter(self.iter_cached_tags(), steps=500):
+                tag.repack()
+
+        after = sum(self.measure_tag_cache().values())
+        enabled = "enabled" if target_state else "disabled"
+        await ctx.send(
+            f"Compact tagscript storage is {enabled}, with up to "
+            f"{humanize_number(store.max_size)} tagscripts kept decompressed.\n"
+            f"Tag cache memory: ~{humanize_number(before // 1024)} KiB -> "
+            f"~{humanize_number(after // 1024)} KiB."
+        )
+
+    @tagsettings.command("memory")
+    async def tagsettings_memory(self, ctx: commands.Context):
+        """
+        View an estimate of the memory used by cached tags.
+        """
+        usage = self.measure_tag_cache()
+        store = self.tagscript_store
+        description = [
+            f"**Tags**: `{humanize_number(usage['tags'] // 1024)}` KiB",
+            f"**Stored TagScript**: `{humanize_number(usage['tagscripts'] // 1024)}` KiB",
+            f"**Parsed TagScript**: `{humanize_number(usage['parsed'] // 1024)}` KiB",
+            f"**Decompressed TagScript**: `{humanize_number(usage['hot'] // 1024)}` KiB "
+            f"(`{humanize_number(len(store))}` / `{humanize_number(store.max_size)}`)",
+            f"**Lookup Tables**: `{humanize_number(usage['lookup'] // 1024)}` KiB",
+            f"**Search Indexes**: `{humanize_number(usage['search'] // 1024)}` KiB",
+            f"**Tag Listings**: `{humanize_number(usage['listings'] // 1024)}` KiB",
+            f"**Total**: ~`{humanize_number(sum(usage.values()) // 1024)}` KiB",
+            f"**Compact Mode**: `{store.enabled}` "
+            f"(`{store.hits}` hits, `{store.misses}` misses)",
+        ]
+        embed = discord.Embed(
+            title="Tag Cache Memory",
+            color=await ctx.embed_color(),
+            description="\n".join(description),
+        )
+        await ctx.send(embed=embed)
+
+    @tagsettings.command("concurrency")
+    async def tagsettings_concurrency(
+        self,
+        ctx: commands.Context,
+        per_server: int,
+        total: int,
+        queue_size: int = 20,
+    ):
+        """
+        Set how many tags can be processed at once.
+
+        Each server can process `per_server` tags at once, and at most `total` across the bot.
+        Up to `queue_size` invocations per server wait for a free slot. Any more, or any that wait
+        too long, are dropped with an hourglass reaction, so one server spamming tags can't slow
+        down the rest.
+        """
+        if not 1 <= per_server <= total:
+            return await ctx.send("The per-server limit must be between 1 and the total limit.")
+        if total > 500:
+            return await ctx.send("The total limit can't be higher than 500.")
+        if not 0 <= queue_size <= 1000:
+            return await ctx.send("The queue size must be between 0 and 1000.")
+        await self.config.guild_concurrency.set(per_server)
+        await self.config.global_concurrency.set(total)
+        await self.config.tag_queue_size.set(queue_size)
+        # invocations already running finish under the previous limiter
+        self.tag_limiter = InvocationLimiter(per_server, total, queue_size)
+        await ctx.send(
+            f"Servers can now process {per_server} tags at once with {queue_size} waiting, "
+            f"and {total} tags can run at once across the bot."
+        )
+
+    @tagsettings.command("queue")
+    async def tagsettings_queue(self, ctx: commands.Context):
+        """View tag concurrency and queue stats since the limits were last set."""
+        limiter = self.tag_limiter
+        description = [
+            f"**Running**: `{sum(limiter.active.values())}` / `{limiter.global_limit}`",
+            f"**Queued**: `{sum(limiter.waiting.values())}` (peak `{limiter.peak_waiting}`)",
+            f"**Completed**: `{humanize_number(limiter.completed)}`",
+            f"**Rejected**: `{humanize_number(sum(limiter.rejected.values()))}`",
+        ]
+        if limiter.rejected:
+            description.append("\n**Most Rejected Servers**")
+            for guild_id, count in limiter.rejected.most_common(5):
+                guild = self.bot.get_guild(guild_id) if guild_id else None
+                name = guild.name if guild else guild_id or "Direct Messages"
+                description.append(f"{name}: `{humanize_number(count)}`")
+        embed = discord.Embed(
+            title="Tag Queue",
+            color=await ctx.embed_color(),
+            description="\n".join(description),
+        )
+        await ctx.send(embed=embed)
+
+    @tagsettings.command("slowthreshold")
+    async def tagsettings_slowthreshold(self, ctx: commands.Context, milliseconds: int):
+        """
+        Log tag invocations that take longer than the given number of milliseconds.
+
+        Logged invocations include the tag name, server, and time spent in each stage.
+        Use `0` to disable.
+        """
+        if milliseconds < 0:
+            return await ctx.send("The threshold can't be negative.")
+        await self.config.slow_tag_threshold.set(milliseconds)
+        self.slow_tag_threshold = milliseconds
+        if milliseconds:
+            await ctx.send(f"Tag invocations slower than {milliseconds}ms will now be logged.")
+        else:
+            await ctx.send("Slow tag invocations will no longer be logged.")
+
+    @tagsettings.command("slowtags")
+    async def tagsettings_slowtags(self, ctx: commands.Context, limit: int = 10):
+        """
+        View the slowest tags since the cog was loaded.
+
+        Tags are ranked by the 95th percentile of their recent invocation times.
+        Times are in milliseconds.
+        """
+        profiles = self.profiler.worst(max(1, min(limit, 50)))
+        if not profiles:
+            return await ctx.send("No tags have been invoked since the cog was loaded.")
+        rows = []
+        for (guild_id, name), profile in profiles:
+            rows.append(
+                (
+                    name,
+                    guild_id or "global",
+                    profile.calls,
+                    round(profile.percentile(50), 1),
+                    round(profile.percentile(95), 1),
+                    round(profile.percentile(100), 1),
+                    profile.slowest_stage(),
+                )
+            )
+        table = tabulate(rows, headers=("Tag", "Scope", "Calls", "p50", "p95", "Max", "Slowest"))
+        await ctx.send_interactive(
+            pagify(table, page_length=1900, shorten_by=0), box_lang="prolog"
+        )
+
+    @tagsettings.command("flushinterval")
+    async def tagsettings_flushinterval(self, ctx: commands.Context, seconds: int):
+        """
+        Set how often tag usage counts are saved.
+
+        Tag uses are counted in memory and written in batches instead of on every invocation.
+        Pending counts are always saved when the cog is unloaded.
+        """
+        if not 10 <= seconds <= 3600:
+            return await ctx.send("The flush interval must be between 10 and 3600 seconds.")
+        await self.config.usage_flush_interval.set(seconds)
+        self.usage_flush_interval = seconds
+        await ctx.send(f"Tag usage will now be saved every {seconds} seconds.")
+
+    @tagsettings.command("searchworkers")
+    async def tagsettings_searchworkers(self, ctx: commands.Context, workers: int):
+        """
+        Set how many threads are used to score tag searches.
+
+        Use `1` to score on a single thread or `-1` to use every available core.
+        Multiple workers require `numpy` to be installed.
+        """
+        if workers == 0 or workers < -1:
+            return await ctx.send("The worker count must be a positive number or `-1`.")
+        if workers != 1 and not MULTI_WORKER_SUPPORTED:
+            return await ctx.send(
+                "Multi-worker search requires `numpy`. Install it with "
+                f"`{ctx.clean_prefix}pipinstall numpy` and try again."
+            )
+        await self.config.search_workers.set(workers)
+        self.search_workers = workers
+        await ctx.send(f"Tag searches will now use `{workers}` worker(s).")
+
+    @tagsettings.command("warmup")
+    async def tagsettings_warmup(self, ctx: commands.Context, servers: int):
+        """
+        Set how many servers have their tags cached when the cog loads.
+
+        Server tags are otherwise cached the first time they're used. The servers that invoked
+        tags the most during the previous session are cached first. Use `0` to disable.
+        """
+        if servers < 0:
+            return await ctx.send("The number of servers can't be negative.")
+        await self.config.eager_cache_guilds.set(servers)
+        self.eager_cache_guilds = servers
+        await ctx.send(f"The {servers} most active servers will be cached on load.")
+
     @tagsettings.command("dotparam")
     async def tagsettings_dotparam(self, ctx: commands.Context, true_or_false: bool = None):
         """
@@ -206,6 +563,191 @@ class OwnerCommands(MixinMeta):
             "Blocks will be parsed like this: `{declaration%s:payload}`." % parameter
         )
 
+    @tagsettings.command("export")
+    async def tagsettings_export(self, ctx: commands.Context, server_id: int = None):
+        """
+        Export tags to a JSONL file.
+
+        Each line of the file is one tag. All global tags and the tags of every server the bot is
+        in are exported, unless a server ID is given. Large exports are gzipped to fit within
+        Discord's upload limit.
+
+        **Example:**
+        `[p]tagset export`
+        `[p]tagset export 133049272517001216`
+        """
+        await self.flush_tag_usage()
+        if server_id is not None:
+            scopes = [str(server_id)]
+        else:
+            scopes = [GLOBAL_SCOPE, *(str(guild.id) for guild in self.bot.guilds)]
+
+        exported = 0
+        async with ctx.typing():
+            with tempfile.TemporaryFile() as fp:
+                async for scope in AsyncIter(scopes, steps=50):
+                    tags = await self.config.custom("Tag", scope).all()
+                    for name, data in tags.items():
+                        fp.write(dump_tag(scope, name, data))
+                    exported += len(tags)
+                    del tags
+                if not exported:
+                    return await ctx.send("There are no tags to export.")
+
+                filename = "tags.jsonl"
+                limit = ctx.guild.filesize_limit if ctx.guild else DEFAULT_FILE_SIZE_LIMIT_BYTES
+                if fp.tell() > limit:
+                    fp.seek(0)
+                    compressed = tempfile.TemporaryFile()
+                    with gzip.GzipFile(filename=filename, mode="wb", fileobj=compressed) as gz:
+                        shutil.copyfileobj(fp, gz)
+                    fp.close()
+                    fp, filename = compressed, f"{filename}.gz"
+                if fp.tell() > limit:
+                    fp.close()
+                    return await ctx.send(
+                        "The export is too large to upload, even compressed. "
+                        "Try exporting one server at a time."
+                    )
+                fp.seek(0)
+                await ctx.send(
+                    f"Exported {humanize_number(exported)} tags.",
+                    file=discord.File(fp, filename),
+                )
+                fp.close()
+
+    @tagsettings.command("import")
+    async def tagsettings_import(self, ctx: commands.Context, overwrite: bool = False):
+        """
+        Import tags from a JSONL file.
+
+        Attach a file created with `[p]tagset export`. Tags that already exist are skipped
+        unless `overwrite` is true, as are tags past a server's tag limit. Aliases that conflict
+        with existing tags or commands are dropped.
+
+        **Example:**
+        `[p]tagset import`
+        `[p]tagset import True`
+        """
+        if not ctx.message.attachments:
+            return await ctx.send_help()
+        attachment = ctx.message.attachments[0]
+
+        counts = Counter()
+        errors: Dict[int, str] = {}
+        read_error = None
+        async with ctx.typing():
+            with tempfile.TemporaryFile() as fp:
+                async with self.session.get(attachment.url) as response:
+                    if response.status != 200:
+                        return await ctx.send("I couldn't download that file.")
+                    async for chunk in response.content.iter_chunked(IMPORT_CHUNK_SIZE):
+                        fp.write(chunk)
+                fp.seek(0)
+
+                try:
+                    for scope, tags, line_numbers in group_lines(iter_lines(fp), errors):
+                        await self.validate_import_batch(ctx, tags, line_numbers, errors)
+                        counts.update(await self.import_tag_scope(scope, tags, overwrite))
+                except TransferReadError as error:
+                    if not error.line:
+                        return await ctx.send("That file isn't valid JSONL or gzipped JSONL.")
+                    read_error = error
+
+        lines = []
+        if read_error:
+            lines.append(f"{read_error} Only the tags before it were imported.")
+        lines.append(f"Imported {humanize_number(counts['imported'])} tags.")
+        if counts["skipped"]:
+            lines.append(
+                f"Skipped {humanize_number(counts['skipped'])} tags that already exist "
+                "or share a command's name."
+            )
+        if counts["limited"]:
+            lines.append(
+                f"Skipped {humanize_number(counts['limited'])} tags over the tag limit "
+                f"({TAG_GUILD_LIMIT} per server, {TAG_GLOBAL_LIMIT} global)."
+            )
+        if errors:
+            lines.append(f"{humanize_number(len(errors))} lines were invalid:")
+            lines.extend(
+                f"Line {number}: {error}" for number, error in sorted(errors.items())[:10]
+            )
+        await ctx.send("\n".join(lines))
+
+    async def validate_import_batch(
+        self,
+        ctx: commands.Context,
+        tags: Dict[str, dict],
+        line_numbers: Dict[str, int],
+        errors: Dict[int, str],
+    ):
+        """Drop imported tags whose tagscript fails validation, recording why by line number."""
+        async for name, data in AsyncIter(list(tags.items()), steps=50):
+            try:
+                await self.validate_tagscript(ctx, data["tag"])
+            except TagError as error:
+                errors[line_numbers[name]] = str(error)
+                del tags[name]
+
+    async def import_tag_scope(
+        self, scope: str, tags: Dict[str, dict], overwrite: bool = False
+    ) -> Dict[str, int]:
+        """
+        Merge a batch of imported tags into a scope with a single Config write.
+
+        Returns how many tags were imported, skipped as existing tags or command names, and
+        skipped for being over the scope's tag limit.
+        """
+        guild_id = None if scope == GLOBAL_SCOPE else int(scope)
+        limit = TAG_GUILD_LIMIT if guild_id else TAG_GLOBAL_LIMIT
+        imported = {}
+        skipped = limited = 0
+        async with self.config.custom("Tag", scope).all() as stored:
+            taken = {}
+            for name, data in stored.items():
+                taken[name] = name
+                for alias in data.get("aliases", []):
+                    taken[alias] = name
+
+            for name, data in tags.items():
+                if name in taken and not (overwrite and taken[name] == name):
+                    skipped += 1
+                    continue
+                if self.bot.get_command(name):
+                    skipped += 1
+                    continue
+                if name not in stored and len(stored) >= limit:
+                    limited += 1
+                    continue
+                if name in stored:
+                    for alias in stored[name].get("aliases", []):
+                        taken.pop(alias, None)
+                data["aliases"] = [
+                    alias
+                    for alias in data["aliases"]
+                    if alias not in taken and not self.bot.get_command(alias)
+                ]
+                if data["created_at"] is None:
+                    data["created_at"] = time.time()
+                taken[name] = name
+                taken.update(dict.fromkeys(data["aliases"], name))
+                stored[name] = imported[name] = data
+        await self.index_tag_authors(
+            (data["author_id"], scope, name) for name, data in imported.items()
+        )
+
+        cached = guild_id in self._cached_guilds if guild_id else self._global_tags_cached
+        if cached:
+            cache = self.guild_tag_cache[guild_id] if guild_id else self.global_tag_cache
+            async for name, data in AsyncIter(imported.items(), steps=100):
+                if old_tag := cache.get(name):
+                    old_tag.remove_from_cache()
+                Tag.from_dict(self, name, data, guild_id=guild_id).add_to_cache()
+        if imported:
+            log.info("Imported %s tags into scope %s.", len(imported), scope)
+        return {"imported": len(imported), "skipped": skipped, "limited": limited}
+
     @commands.is_owner()
     @commands.command()
     async def migratealias(self, ctx: commands.Context):
@@ -24,21 +24,46 @@ SOFTWARE.
 
 import asyncio
 import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
 from copy import copy
-from typing import Dict, List, Optional
+from functools import partial
+from typing import FrozenSet, List, Optional, Set, Union
 
 import discord
 import TagScriptEngine as tse
+from discord.ext.commands.view import StringView
 from redbot.core import commands
 from redbot.core.utils.menus import start_adding_reactions
 
 from ..abc import MixinMeta
-from ..blocks import DeleteBlock, ReactBlock, SilentBlock
-from ..errors import BlacklistCheckFailure, RequireCheckFailure, WhitelistCheckFailure
+from ..blocks import CooldownBlock, DeleteBlock, ReactBlock, SilentBlock
+from ..check_cache import CheckCache, ResolvedItems
+from ..errors import (
+    BlacklistCheckFailure,
+    RequireCheckFailure,
+    TagTimeoutError,
+    WhitelistCheckFailure,
+)
+from ..interpreter import (
+    AsyncInterpreter,
+    Interpreter,
+    ParseCache,
+    get_restricted_declarations,
+)
+from ..limiter import InvocationLimiter, LimiterBusy
 from ..objects import SilentContext, Tag
+from ..profiler import InvocationTimer, TagProfiler
+from ..reactions import EmojiCache, ReactionLimiter
+from ..seed import SeedVariables
 
 log = logging.getLogger("red.phenom4n4n.tags.processor")
 
+# set while a tag's command blocks run, so tags they start don't wait on the slot held by the
+# invocation that started them
+_in_command_block: ContextVar[bool] = ContextVar("tags_in_command_block", default=False)
+
 
 class Processor(MixinMeta):
     def __init__(self):
@@ -46,18 +71,79 @@ class Processor(MixinMeta):
         self.channel_converter = commands.TextChannelConverter()
         self.member_converter = commands.MemberConverter()
         self.emoji_converter = commands.EmojiConverter()
+        self.parse_cache = ParseCache()
+        self.validation_cache: OrderedDict = OrderedDict()
+        self.restricted_declarations: Optional[FrozenSet[str]] = None
+        self.interpreter_executor: Optional[ThreadPoolExecutor] = None
+        self.interpreter_threads: int = 0
+        self.interpreter_timeout: float = 10.0
+        self.profiler = TagProfiler()
+        self.check_cache = CheckCache()
+        self.emoji_cache = EmojiCache()
+        self.reaction_limiter = ReactionLimiter()
+        self.command_block_mode: str = "ordered"
+        self.tag_limiter = InvocationLimiter()
+        self.slow_tag_threshold: int = 0
 
         self.bot.add_dev_env_value("tse", lambda ctx: tse)
         super().__init__()
 
     async def cog_unload(self):
         self.bot.remove_dev_env_value("tse")
+        self.set_interpreter_threads(0)
         await super().cog_unload()
 
+    def set_interpreter_threads(self, threads: int):
+        """
+        Set how many worker threads process tags with the synchronous interpreter.
+
+        `0` processes tags directly on the event loop.
+        """
+        if threads == self.interpreter_threads:
+            return
+        if self.interpreter_executor is not None:
+            self.interpreter_executor.shutdown(wait=False)
+            self.interpreter_executor = None
+        self.interpreter_threads = threads
+        if threads:
+            self.interpreter_executor = ThreadPoolExecutor(
+                max_workers=threads, thread_name_prefix="tags-interpreter"
+            )
+
+    async def interpret(self, tag: Tag, seed_variables: dict, **kwargs) -> tse.Response:
+        process = partial(
+            self.engine.process,
+            tag.tagscript,
+            seed_variables,
+            dot_parameter=self.dot_parameter,
+            **kwargs,
+        )
+        if self.async_enabled:
+            return await process()
+        if self.interpreter_executor is None:
+            return process()
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.interpreter_executor, process)
+        try:
+            return await asyncio.wait_for(future, self.interpreter_timeout)
+        except asyncio.TimeoutError:
+            # the worker can't be interrupted, so it finishes in the background
+            log.warning(
+                "%s %r (scope %s) exceeded the %s second processing deadline.",
+                tag.name_prefix,
+                tag.name,
+                tag.scope,
+                self.interpreter_timeout,
+            )
+            raise TagTimeoutError(tag.name, self.interpreter_timeout) from None
+
     async def initialize_interpreter(self, data: dict = None):
         if not data:
             data = await self.config.all()
         self.dot_parameter = data["dot_parameter"]
+        self.interpreter_timeout = data["interpreter_timeout"]
+        self.set_interpreter_threads(data["interpreter_threads"])
 
         tse_blocks = [
             tse.MathBlock(),
@@ -83,18 +169,21 @@ class Processor(MixinMeta):
             tse.CommandBlock(),
             tse.OverrideBlock(),
             tse.RedirectBlock(),
-            tse.CooldownBlock(),
+            CooldownBlock(),
         ]
         tag_blocks = [
             DeleteBlock(),
             SilentBlock(),
             ReactBlock(),
         ]
-        interpreter = tse.AsyncInterpreter if data["async_enabled"] else tse.Interpreter
+        interpreter = AsyncInterpreter if data["async_enabled"] else Interpreter
         self.async_enabled = data["async_enabled"]
         self.engine = interpreter(tse_blocks + tag_blocks)
-        for block in await self.compile_blocks(data):
-            self.engine.blocks.append(block())
+        custom_blocks = [block() for block in await self.compile_blocks(data)]
+        self.engine.blocks.extend(custom_blocks)
+        self.parse_cache.set_blocks(self.engine.blocks)
+        self.restricted_declarations = get_restricted_declarations(custom_blocks)
+        self.validation_cache.clear()
 
     @commands.Cog.listener()
     async def on_command_error(
@@ -103,11 +192,31 @@ class Processor(MixinMeta):
         if not isinstance(error, commands.CommandNotFound):
             return
         message: discord.Message = ctx.message
+        await self.ensure_guild_cached(ctx.guild)
         tag = self.get_tag(ctx.guild, ctx.invoked_with, check_global=True)
         if tag and await self.message_eligible_as_tag(message):
-            prefix = ctx.prefix
-            tag_command = message.content[len(prefix) :]
-            await self.invoke_tag_message(message, prefix, tag_command)
+            tag_command = message.content[len(ctx.prefix) :]
+            await self.invoke_tag_context(ctx, tag, tag_command)
+
+    @commands.Cog.listener("on_guild_role_create")
+    @commands.Cog.listener("on_guild_role_delete")
+    async def invalidate_role_checks(self, role: discord.Role):
+        self.check_cache.invalidate(role.guild.id)
+
+    @commands.Cog.listener("on_guild_role_update")
+    async def invalidate_role_update_checks(self, before: discord.Role, after: discord.Role):
+        self.check_cache.invalidate(after.guild.id)
+
+    @commands.Cog.listener("on_guild_channel_create")
+    @commands.Cog.listener("on_guild_channel_delete")
+    async def invalidate_channel_checks(self, channel: discord.abc.GuildChannel):
+        self.check_cache.invalidate(channel.guild.id)
+
+    @commands.Cog.listener("on_guild_channel_update")
+    async def invalidate_channel_update_checks(
+        self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel
+    ):
+        self.check_cache.invalidate(after.guild.id)
 
     async def message_eligible_as_tag(self, message: discord.Message) -> bool:
         if message.guild:
@@ -117,38 +226,125 @@ class Processor(MixinMeta):
         else:
             return await self.bot.allowed_by_whitelist_blacklist(message.author)
 
-    async def invoke_tag_message(self, message: discord.Message, prefix: str, tag_command: str):
-        new_message = copy(message)
-        new_message.content = f"{prefix}invoketag False {tag_command}"
-        ctx = await self.bot.get_context(new_message)
-        await self.bot.invoke(ctx)
+    async def invoke_tag_context(self, ctx: commands.Context, tag: Tag, tag_command: str):
+        """
+        Process an already resolved tag as an invocation of `invoketag`.
+
+        The tag runs under a copy of the failed lookup's context, since Red's own error handlers
+        are still using the original. `invoketag`'s enabled state, checks, concurrency limits,
+        cooldowns, hooks and error handling apply as they would through `bot.invoke`, without
+        parsing the message or resolving the tag a second time.
+        """
+        command = self.invoketag
+        ctx = copy(ctx)
+        ctx.command = command
+        ctx.invoked_with = command.name
+        ctx.command_failed = False
+        ctx.view = view = StringView(tag_command)
+        view.get_word()
+        view.skip_ws()
+        args = view.read_rest().strip()
+
+        self.bot.dispatch("command", ctx)
+        try:
+            if not await self.bot.can_run(ctx, call_once=True):
+                raise commands.CheckFailure("The global check once functions failed.")
+            await self.prepare_tag_invoke(ctx, command)
+            await self.invoke_tag_callback(ctx, command, tag, args)
+        except commands.CommandError as error:
+            await command.dispatch_error(ctx, error)
+        else:
+            self.bot.dispatch("command_completion", ctx)
+
+    @staticmethod
+    async def prepare_tag_invoke(ctx: commands.Context, command: commands.Command):
+        """Run the parts of `Command.prepare` that don't parse arguments."""
+        if not command.is_enabled(ctx.guild):
+            raise commands.DisabledCommand(f"{command.name} command is disabled")
+        if not await command.can_run(ctx, change_permission_state=True):
+            raise commands.CheckFailure(
+                f"The check functions for command {command.qualified_name} failed."
+            )
+
+        max_concurrency = command._max_concurrency
+        if max_concurrency is not None:
+            await max_concurrency.acquire(ctx)
+        try:
+            command._prepare_cooldowns(ctx)
+            await command.call_before_hooks(ctx)
+        except BaseException:
+            if max_concurrency is not None:
+                await max_concurrency.release(ctx)
+            raise
+
+    async def invoke_tag_callback(
+        self, ctx: commands.Context, command: commands.Command, tag: Tag, args: str
+    ):
+        """Process the tag the way discord.py wraps a command's callback."""
+        try:
+            await self.process_tag(ctx, tag, seed_variables={"args": tse.StringAdapter(args)})
+        except commands.CommandError:
+            ctx.command_failed = True
+            raise
+        except asyncio.CancelledError:
+            ctx.command_failed = True
+        except Exception as error:
+            ctx.command_failed = True
+            raise commands.CommandInvokeError(error) from error
+        finally:
+            if command._max_concurrency is not None:
+                await command._max_concurrency.release(ctx)
+            await command.call_after_hooks(ctx)
 
     @staticmethod
-    def get_seed_from_context(ctx: commands.Context) -> Dict[str, tse.Adapter]:
-        author = tse.MemberAdapter(ctx.author)
-        target = tse.MemberAdapter(ctx.message.mentions[0]) if ctx.message.mentions else author
-        channel = tse.ChannelAdapter(ctx.channel)
-        seed = {
-            "author": author,
-            "user": author,
-            "target": target,
-            "member": target,
-            "channel": channel,
-        }
-        if ctx.guild:
-            guild = tse.GuildAdapter(ctx.guild)
-            seed.update(guild=guild, server=guild)
-        return seed
+    def get_seed_from_context(ctx: commands.Context) -> SeedVariables:
+        return SeedVariables(ctx)
 
     async def process_tag(
         self, ctx: commands.Context, tag: Tag, *, seed_variables: dict = None, **kwargs
     ) -> str:
-        seed_variables = {} if seed_variables is None else seed_variables
         seed = self.get_seed_from_context(ctx)
-        seed_variables.update(seed)
+        if seed_variables:
+            # the context's variables take precedence over the caller's
+            seed.update(
+                {name: value for name, value in seed_variables.items() if name not in seed}
+            )
+        seed_variables = seed
+
+        timer = InvocationTimer()
+        if _in_command_block.get():
+            # the invocation that started this one already holds a slot
+            await self.run_tag_invocation(ctx, tag, seed_variables, timer, **kwargs)
+            return
+
+        guild_id = ctx.guild.id if ctx.guild else None
+        try:
+            async with self.tag_limiter.acquire(guild_id):
+                await self.run_tag_invocation(ctx, tag, seed_variables, timer, **kwargs)
+        except LimiterBusy as error:
+            log.debug("Dropped an invocation of %r in %s: %r", tag.name, guild_id, error)
+            start_adding_reactions(ctx.message, ["\N{HOURGLASS}"])
 
-        output = await tag.run(seed_variables, **kwargs)
-        await tag.update_config()
+    async def run_tag_invocation(
+        self,
+        ctx: commands.Context,
+        tag: Tag,
+        seed_variables: dict,
+        timer: InvocationTimer,
+        **kwargs,
+    ):
+        timer.stages["queued"] = timer.elapsed()
+        try:
+            with timer.measure("interpret"):
+                output = await tag.run(seed_variables, **kwargs)
+            await self.handle_tag_output(ctx, tag, output, timer)
+        finally:
+            self.record_tag_timing(ctx, tag, timer)
+
+    async def handle_tag_output(
+        self, ctx: commands.Context, tag: Tag, output: tse.Response, timer: InvocationTimer
+    ):
+        self.queue_tag_usage(tag)
         dispatch_prefix = "tag" if tag.guild_id else "g-tag"
         self.bot.dispatch("commandstats_action_v2", f"{dispatch_prefix}:{tag}", ctx.guild)
         to_gather = []
@@ -158,7 +354,8 @@ class Processor(MixinMeta):
 
         if actions:
             try:
-                await self.validate_checks(ctx, actions)
+                with timer.measure("checks"):
+                    await self.validate_checks(ctx, actions)
             except RequireCheckFailure as error:
                 response = error.response
                 if response is None:
@@ -170,7 +367,9 @@ class Processor(MixinMeta):
                 to_gather.append(self.delete_quietly(ctx))
 
             if delete is False and (reactu := actions.get("reactu")):
-                to_gather.append(self.react_to_list(ctx, ctx.message, reactu))
+                to_gather.append(
+                    timer.timed("reactions", self.react_to_list(ctx, ctx.message, reactu))
+                )
 
             if actions.get("commands"):
                 for command in actions["commands"]:
@@ -182,17 +381,34 @@ class Processor(MixinMeta):
                     command_messages.append(new)
 
         # this is going to become an asynchronous swamp
-        msg = await self.send_tag_response(ctx, actions, content)
+        with timer.measure("send"):
+            msg = await self.send_tag_response(ctx, actions, content)
         if msg and (react := actions.get("react")):
-            to_gather.append(self.react_to_list(ctx, msg, react))
+            to_gather.append(timer.timed("reactions", self.react_to_list(ctx, msg, react)))
         if command_messages:
             silent = actions.get("silent", False)
             overrides = actions.get("overrides")
-            to_gather.append(self.process_commands(command_messages, silent, overrides))
+            to_gather.append(
+                timer.timed("commands", self.process_commands(command_messages, silent, overrides))
+            )
 
         if to_gather:
             await asyncio.gather(*to_gather)
 
+    def record_tag_timing(self, ctx: commands.Context, tag: Tag, timer: InvocationTimer):
+        total = timer.stop()
+        if tag._real_tag:
+            self.profiler.record(tag.guild_id, tag.name, timer)
+        if self.slow_tag_threshold and total >= self.slow_tag_threshold:
+            log.warning(
+                "%s %r took %.0fms in %s (%s).",
+                tag.name_prefix,
+                tag.name,
+                total,
+                f"guild {ctx.guild.id}" if ctx.guild else "DMs",
+                ", ".join(f"{stage} {ms:.0f}ms" for stage, ms in timer.stages.items()),
+            )
+
     @staticmethod
     async def send_quietly(destination: discord.abc.Messageable, content: str = None, **kwargs):
         try:
@@ -237,25 +453,47 @@ class Processor(MixinMeta):
 
     async def process_commands(
         self, messages: List[discord.Message], silent: bool, overrides: dict
-    ):
-        command_tasks = []
-        for message in messages:
-            command_task = asyncio.create_task(self.process_command(message, silent, overrides))
-            command_tasks.append(command_task)
-            await asyncio.sleep(0.1)
-        await asyncio.gather(*command_tasks)
-
-    async def process_command(
-        self, command_message: discord.Message, silent: bool, overrides: dict
     ):
         command_cls = SilentContext if silent else commands.Context
-        ctx = await self.bot.get_context(command_message, cls=command_cls)
-        if not ctx.valid:
-            return
+        contexts = await asyncio.gather(
+            *(self.bot.get_context(message, cls=command_cls) for message in messages)
+        )
+        contexts = [ctx for ctx in contexts if ctx.valid]
+        # tasks copy the current context, so this covers every command started below
+        token = _in_command_block.set(True)
+        try:
+            mode = self.command_block_mode
+            if mode == "serial":
+                for ctx in contexts:
+                    await self.process_command(ctx, overrides)
+            elif mode == "ordered":
+                command_tasks = []
+                for ctx in contexts:
+                    command_tasks.append(asyncio.create_task(self.process_command(ctx, overrides)))
+                    # let each command start before the next one, without waiting for it to end
+                    await asyncio.sleep(0)
+                await asyncio.gather(*command_tasks)
+            else:
+                await asyncio.gather(*(self.process_command(ctx, overrides) for ctx in contexts))
+        finally:
+            _in_command_block.reset(token)
+
+    async def process_command(self, ctx: commands.Context, overrides: dict):
+        await self.wait_for_rate_limits()
         if overrides:
             ctx.command = self.handle_overrides(ctx.command, overrides)
         await self.bot.invoke(ctx)
 
+    async def wait_for_rate_limits(self):
+        """
+        Hold command blocks back only while the bot's gateway connection is rate limited.
+
+        HTTP rate limits, including the global one, are already waited out by discord.py's HTTP
+        client for every request the commands make.
+        """
+        while self.bot.is_ws_ratelimited():
+            await asyncio.sleep(0.1)
+
     @classmethod
     def handle_overrides(cls, command: commands.Command, overrides: dict) -> commands.Command:
         overriden_command = copy(command)
@@ -294,31 +532,38 @@ class Processor(MixinMeta):
             await asyncio.gather(*to_gather)
 
     async def validate_requires(self, ctx: commands.Context, requires: dict):
-        for argument in requires["items"]:
-            role_or_channel = await self.role_or_channel_convert(ctx, argument)
-            if not role_or_channel:
-                continue
-            if (
-                isinstance(role_or_channel, discord.Role)
-                and role_or_channel in ctx.author.roles
-                or not isinstance(role_or_channel, discord.Role)
-                and role_or_channel == ctx.channel
-            ):
-                return
-        raise WhitelistCheckFailure(requires["response"])
+        resolved = await self.resolve_check_items(ctx, requires["items"])
+        if not resolved.matches(self.get_author_role_ids(ctx), ctx.channel.id):
+            raise WhitelistCheckFailure(requires["response"])
 
     async def validate_blacklist(self, ctx: commands.Context, blacklist: dict):
-        for argument in blacklist["items"]:
+        resolved = await self.resolve_check_items(ctx, blacklist["items"])
+        if resolved.matches(self.get_author_role_ids(ctx), ctx.channel.id):
+            raise BlacklistCheckFailure(blacklist["response"])
+
+    @staticmethod
+    def get_author_role_ids(ctx: commands.Context) -> Set[int]:
+        if not isinstance(ctx.author, discord.Member):
+            return set()
+        # the @everyone role shares the guild's ID and isn't stored with the member's roles
+        return {ctx.guild.id, *ctx.author._roles}
+
+    async def resolve_check_items(self, ctx: commands.Context, items: List[str]) -> ResolvedItems:
+        guild_id = ctx.guild.id if ctx.guild else None
+        key = tuple(items)
+        if resolved := self.check_cache.get(guild_id, key):
+            return resolved
+        role_ids = set()
+        channel_ids = set()
+        for argument in items:
             role_or_channel = await self.role_or_channel_convert(ctx, argument)
-            if not role_or_channel:
-                continue
-            if (
-                isinstance(role_or_channel, discord.Role)
-                and role_or_channel in ctx.author.roles
-                or not isinstance(role_or_channel, discord.Role)
-                and role_or_channel == ctx.channel
-            ):
-                raise BlacklistCheckFailure(blacklist["response"])
+            if isinstance(role_or_channel, discord.Role):
+                role_ids.add(role_or_channel.id)
+            elif role_or_channel:
+                channel_ids.add(role_or_channel.id)
+        resolved = ResolvedItems(frozenset(role_ids), frozenset(channel_ids))
+        self.check_cache.set(guild_id, key, resolved)
+        return resolved
 
     async def role_or_channel_convert(self, ctx: commands.Context, argument: str):
         objects = await asyncio.gather(
@@ -334,16 +579,35 @@ class Processor(MixinMeta):
     ):
         if not (message and args):
             return
-        for arg in args:
-            try:
-                arg = await self.emoji_converter.convert(ctx, arg)
-            except commands.BadArgument:
-                pass
+        emojis = [await self.convert_emoji(ctx, arg) for arg in args]
+        await asyncio.gather(*(self.add_reaction_quietly(message, emoji) for emoji in emojis))
+
+    async def convert_emoji(
+        self, ctx: commands.Context, argument: str
+    ) -> Union[discord.Emoji, str]:
+        guild_id = ctx.guild.id if ctx.guild else None
+        if emoji := self.emoji_cache.get(guild_id, argument):
+            return emoji
+        try:
+            emoji = await self.emoji_converter.convert(ctx, argument)
+        except commands.BadArgument:
+            emoji = argument
+        self.emoji_cache.set(guild_id, argument, emoji)
+        return emoji
+
+    async def add_reaction_quietly(
+        self, message: discord.Message, emoji: Union[discord.Emoji, str]
+    ):
+        async with self.reaction_limiter.slot(message.channel.id):
             try:
-                await message.add_reaction(arg)
+                await message.add_reaction(emoji)
             except discord.HTTPException:
                 pass
 
+    @commands.Cog.listener()
+    async def on_guild_emojis_update(self, guild: discord.Guild, before, after):
+        self.emoji_cache.clear()
+
     @staticmethod
     async def delete_quietly(ctx: commands.Context):
         if ctx.channel.permissions_for(ctx.me).manage_messages:
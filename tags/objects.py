@@ -31,25 +31,32 @@ from redbot.core import Config, commands
 from redbot.core.bot import Red
 from redbot.core.utils.chat_formatting import box, humanize_list, humanize_number, inline, pagify
 
+from .blocks import CooldownBlock
 from .errors import TagAliasError
+from .interpreter import ParsedTagScript
+from .listing import TagListing
+from .search import TagSearchIndex
 
 hn = humanize_number
 ALIAS_LIMIT = 10
+GLOBAL_SCOPE = "global"
+TAGSCRIPT_LIMIT = 10_000
+TAG_GUILD_LIMIT = 250
+TAG_GLOBAL_LIMIT = 250
 
 
 class Tag:
     __slots__ = (
         "cog",
-        "config",
-        "bot",
         "name",
         "_aliases",
-        "tagscript",
+        "_tagscript",
         "guild_id",
         "author_id",
         "uses",
         "created_at",
         "_real_tag",
+        "_parsed",
     )
 
     def __init__(
@@ -66,11 +73,9 @@ class Tag:
         created_at: datetime = None,
     ):
         self.cog = cog
-        self.config: Config = cog.config
-        self.bot: Red = cog.bot
         self.name: str = name
         self._aliases = aliases or []
-        self.tagscript: str = tagscript
+        self._tagscript = cog.tagscript_store.pack(tagscript)
 
         self.guild_id: Optional[int] = guild_id
         self.author_id: int = author_id
@@ -84,12 +89,13 @@ class Tag:
         self.created_at: datetime = created_at
 
         self._real_tag: bool = real
+        self._parsed: Optional[ParsedTagScript] = None
 
     def __str__(self) -> str:
         return self.name
 
     def __len__(self) -> int:
-        return len(self.tagscript)
+        return len(self.peek_tagscript())
 
     def __hash__(self) -> int:
         return hash(self.name)
@@ -97,15 +103,54 @@ class Tag:
     def __repr__(self) -> str:
         return f"<Tag name={self.name!r} guild_id={self.guild_id} length={len(self)} aliases={self.aliases!r}>"
 
+    @property
+    def config(self) -> Config:
+        return self.cog.config
+
+    @property
+    def bot(self) -> Red:
+        return self.cog.bot
+
+    @property
+    def tagscript(self) -> str:
+        return self.cog.tagscript_store.unpack(self, self._tagscript)
+
+    @tagscript.setter
+    def tagscript(self, tagscript: str):
+        store = self.cog.tagscript_store
+        store.discard(self)
+        self._tagscript = store.pack(tagscript)
+        self._parsed = None
+
+    def peek_tagscript(self) -> str:
+        """Get the tagscript without counting it as a use in compact mode's LRU."""
+        return self.cog.tagscript_store.peek(self, self._tagscript)
+
+    def repack(self):
+        """Store the tagscript again under the current compact mode setting."""
+        self.tagscript = self.peek_tagscript()
+
     @property
     def cache_path(self) -> dict:
         return (
             self.cog.guild_tag_cache[self.guild_id] if self.guild_id else self.cog.global_tag_cache
         )
 
+    @property
+    def listing(self) -> TagListing:
+        return self.cog.tag_listings[self.guild_id]
+
+    @property
+    def search_index(self) -> TagSearchIndex:
+        return self.cog.search_indexes[self.guild_id]
+
+    @property
+    def scope(self) -> str:
+        return str(self.guild_id) if self.guild_id else GLOBAL_SCOPE
+
     @property
     def config_path(self):
-        return self.config.guild_from_id(self.guild_id) if self.guild_id else self.config
+        return self.config.custom("Tag", self.scope, self.name)
 
     @property
     def guild(self) -> Optional[discord.Guild]:
@@ -129,27 +174,23 @@ class Tag:
 
     async def run(self, seed_variables: dict, **kwargs) -> tse.Response:
         self.uses += 1
+        self.listing.update(self)
         seed_variables["uses"] = tse.IntAdapter(self.uses)
         cog = self.cog
-        output = cog.engine.process(
-            self.tagscript,
-            seed_variables,
-            dot_parameter=cog.dot_parameter,
-            cooldown_key=self.cooldown_key,
-            **kwargs,
+        self._parsed = parsed = cog.parse_cache.get(self.tagscript, self._parsed)
+        return await cog.interpret(
+            self, seed_variables, parsed=parsed, cooldown_key=self.cooldown_key, **kwargs
         )
-        if cog.async_enabled:
-            return await output
-        return output
 
     async def update_config(self):
         if self._real_tag:
-            async with self.config_path.tags() as t:
-                t[self.name] = self.to_dict()
+            await self.config_path.set(self.to_dict())
 
     async def initialize(self) -> str:
         self.add_to_cache()
         await self.update_config()
+        if self._real_tag:
+            await self.cog.index_tag_authors([(self.author_id, self.scope, self.name)])
         return f"{self.name_prefix} `{self}` added."
 
     def add_to_cache(self):
@@ -157,6 +198,8 @@ class Tag:
         path[self.name] = self
         for alias in self.aliases:
             path[alias] = self
+        self.search_index.add(self)
+        self.listing.add(self)
 
     def remove_from_cache(self):
         path = self.cache_path
@@ -166,10 +209,10 @@ class Tag:
                 del path[alias]
             except KeyError:
                 pass
-        try:
-            del tse.CooldownBlock.COOLDOWNS[self.cooldown_key]
-        except KeyError:
-            pass
+        self.search_index.remove(self)
+        self.listing.remove(self)
+        CooldownBlock.COOLDOWNS.pop(self.cooldown_key, None)
+        self.cog.tagscript_store.discard(self)
 
     @classmethod
     def from_dict(
@@ -197,15 +240,16 @@ class Tag:
         return {
             "author_id": self.author_id,
             "uses": self.uses,
-            "tag": self.tagscript,
+            "tag": self.peek_tagscript(),
             "aliases": self.aliases,
             "created_at": self.created_at.timestamp(),
         }
 
     async def delete(self) -> str:
-        async with self.config_path.tags() as t:
-            del t[self.name]
+        await self.config_path.clear()
+        await self.cog.unindex_tag_author(self.author_id, self.scope, self.name)
         self.remove_from_cache()
+        self.cog.profiler.remove(self.guild_id, self.name)
         return f"{self.name_prefix} `{self}` deleted."
 
     async def add_alias(self, alias: str) -> str:
@@ -220,6 +264,8 @@ class Tag:
 
         self._aliases.append(alias)
         self.cache_path[alias] = self
+        self.search_index.invalidate()
+        self.listing.update(self)
         await self.update_config()
         return f"`{alias}` has been added as an alias to {self.name_prefix.lower()} `{self}`."
 
@@ -229,20 +275,24 @@ class Tag:
 
         self._aliases.remove(alias)
         del self.cache_path[alias]
+        self.search_index.invalidate()
+        self.listing.update(self)
         await self.update_config()
         return f"Alias `{alias}` removed from {self.name_prefix.lower()} `{self}`."
 
     async def edit_tagscript(self, tagscript: str) -> str:
-        old_tagscript = len(self.tagscript)
+        old_tagscript = len(self)
         self.tagscript = tagscript
+        self.search_index.add(self)
         await self.update_config()
-        return f"Edited `{self}`'s tagscript from **{hn(old_tagscript)}** to **{hn(len(self.tagscript))}** characters."
+        return f"Edited `{self}`'s tagscript from **{hn(old_tagscript)}** to **{hn(len(self))}** characters."
 
     async def append_tagscript(self, tagscript: str) -> str:
-        old_tagscript = len(self.tagscript)
-        self.tagscript += f"\n{tagscript}"
+        old_tagscript = len(self)
+        self.tagscript = f"{self.peek_tagscript()}\n{tagscript}"
+        self.search_index.add(self)
         await self.update_config()
-        return f"Edited `{self}`'s tagscript from **{hn(old_tagscript)}** to **{hn(len(self.tagscript))}** characters."
+        return f"Edited `{self}`'s tagscript from **{hn(old_tagscript)}** to **{hn(len(self))}** characters."
 
     async def get_info(self, ctx: commands.Context) -> discord.Embed:
         desc = [
@@ -268,7 +318,7 @@ class Tag:
         return await ctx.send(embed=await self.get_info(ctx))
 
     async def send_raw_tagscript(self, ctx: commands.Context):
-        for page in pagify(self.tagscript):
+        for page in pagify(self.peek_tagscript()):
             await ctx.send(box(page), allowed_mentions=discord.AllowedMentions.none())
 
 
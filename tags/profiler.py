@@ -0,0 +1,148 @@
+"""
+MIT License
+
+Copyright (c) 2020-present phenom4n4n
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+from typing import Awaitable, Deque, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+__all__ = ("STAGES", "InvocationTimer", "TagProfile", "TagProfiler")
+
+T = TypeVar("T")
+
+STAGES = ("queued", "interpret", "checks", "send", "reactions", "commands")
+SAMPLE_SIZE = 100
+MAX_PROFILES = 1000
+
+
+def percentile(samples: List[float], percent: float) -> float:
+    """Get the nearest-rank percentile of sorted samples."""
+    if not samples:
+        return 0.0
+    index = max(0, min(len(samples) - 1, round(percent / 100 * len(samples)) - 1))
+    return samples[index]
+
+
+class InvocationTimer:
+    """Collects the time spent in each stage of a single tag invocation, in milliseconds."""
+
+    __slots__ = ("start", "stages", "total")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = defaultdict(float)
+        self.total: float = 0.0
+
+    def __repr__(self) -> str:
+        return f"<InvocationTimer total={self.total:.2f}ms stages={dict(self.stages)!r}>"
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[stage] += (time.perf_counter() - start) * 1000
+
+    async def timed(self, stage: str, aw: Awaitable[T]) -> T:
+        with self.measure(stage):
+            return await aw
+
+    def elapsed(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def stop(self) -> float:
+        self.total = self.elapsed()
+        return self.total
+
+
+class TagProfile:
+    """Rolling timing samples for one tag."""
+
+    __slots__ = ("calls", "samples")
+
+    def __init__(self):
+        self.calls: int = 0
+        self.samples: Dict[str, Deque[float]] = {
+            stage: deque(maxlen=SAMPLE_SIZE) for stage in STAGES + ("total",)
+        }
+
+    def __repr__(self) -> str:
+        return f"<TagProfile calls={self.calls} p95={self.percentile(95):.2f}ms>"
+
+    def add(self, timer: InvocationTimer):
+        self.calls += 1
+        for stage in STAGES:
+            self.samples[stage].append(timer.stages.get(stage, 0.0))
+        self.samples["total"].append(timer.total)
+
+    def percentile(self, percent: float, stage: str = "total") -> float:
+        return percentile(sorted(self.samples[stage]), percent)
+
+    def slowest_stage(self) -> str:
+        return max(STAGES, key=lambda stage: sum(self.samples[stage]))
+
+
+class TagProfiler:
+    """
+    Aggregates invocation timings per tag.
+
+    Only the most recent `SAMPLE_SIZE` invocations of each tag are kept, so percentiles reflect
+    how tags currently perform. At most `max_size` tags are profiled, and the least recently
+    invoked tag's profile is dropped to make room for a new one.
+    """
+
+    __slots__ = ("profiles", "max_size")
+
+    def __init__(self, max_size: int = MAX_PROFILES):
+        self.profiles: "OrderedDict[Tuple[Optional[int], str], TagProfile]" = OrderedDict()
+        self.max_size = max_size
+
+    def __repr__(self) -> str:
+        return f"<TagProfiler tags={len(self.profiles)}>"
+
+    def record(self, guild_id: Optional[int], name: str, timer: InvocationTimer):
+        key = (guild_id, name)
+        profiles = self.profiles
+        try:
+            profile = profiles[key]
+        except KeyError:
+            profile = profiles[key] = TagProfile()
+            if len(profiles) > self.max_size:
+                profiles.popitem(last=False)
+        else:
+            profiles.move_to_end(key)
+        profile.add(timer)
+
+    def remove(self, guild_id: Optional[int], name: str):
+        self.profiles.pop((guild_id, name), None)
+
+    def worst(
+        self, limit: int = 10, *, percent: float = 95
+    ) -> List[Tuple[Tuple[Optional[int], str], TagProfile]]:
+        """Get the tags with the highest total time percentile."""
+        profiles = sorted(
+            self.profiles.items(), key=lambda item: item[1].percentile(percent), reverse=True
+        )
+        return profiles[:limit]
@@ -0,0 +1,110 @@
+"""
+MIT License
+
+Copyright (c) 2020-present phenom4n4n
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import asyncio
+from collections import OrderedDict, defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Union
+
+import discord
+
+__all__ = ("EmojiCache", "ReactionLimiter")
+
+EmojiType = Union[discord.Emoji, str]
+
+GUILD_CACHE_SIZE = 128
+# Discord allows one reaction per channel every 250ms
+REACTION_INTERVAL = 0.25
+REACTION_CONCURRENCY = 5
+
+
+class EmojiCache:
+    """
+    Converted emoji arguments, per guild.
+
+    Arguments that don't convert to a custom emoji are cached as-is, since they're sent as
+    unicode emoji. Custom emoji can resolve to any guild the bot is in, so the whole cache is
+    cleared when any guild's emoji change.
+    """
+
+    __slots__ = ("_guilds",)
+
+    def __init__(self):
+        self._guilds: Dict[Optional[int], OrderedDict] = defaultdict(OrderedDict)
+
+    def __repr__(self) -> str:
+        return f"<EmojiCache guilds={len(self._guilds)}>"
+
+    def get(self, guild_id: Optional[int], argument: str) -> Optional[EmojiType]:
+        cache = self._guilds.get(guild_id)
+        if cache is None or (emoji := cache.get(argument)) is None:
+            return None
+        cache.move_to_end(argument)
+        return emoji
+
+    def set(self, guild_id: Optional[int], argument: str, emoji: EmojiType):
+        cache = self._guilds[guild_id]
+        cache[argument] = emoji
+        if len(cache) > GUILD_CACHE_SIZE:
+            cache.popitem(last=False)
+
+    def clear(self):
+        self._guilds.clear()
+
+
+class ReactionLimiter:
+    """
+    Paces reactions per channel to stay within Discord's reaction rate limit.
+
+    Each reaction reserves the next free slot in its channel before it waits, so reactions start
+    in the order they were requested while their requests overlap.
+    """
+
+    __slots__ = ("_semaphore", "_next_slots")
+
+    def __init__(self, concurrency: int = REACTION_CONCURRENCY):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._next_slots: Dict[int, float] = {}
+
+    def __repr__(self) -> str:
+        return f"<ReactionLimiter channels={len(self._next_slots)}>"
+
+    def _reserve(self, channel_id: int, now: float) -> float:
+        start = max(now, self._next_slots.get(channel_id, now))
+        self._next_slots[channel_id] = start + REACTION_INTERVAL
+        if len(self._next_slots) > 1000:
+            self._next_slots = {
+                channel: slot for channel, slot in self._next_slots.items() if slot > now
+            }
+        return start
+
+    @asynccontextmanager
+    async def slot(self, channel_id: int) -> AsyncIterator[None]:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        start = self._reserve(channel_id, now)
+        if start > now:
+            await asyncio.sleep(start - now)
+        async with self._semaphore:
+            yield
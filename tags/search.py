@@ -0,0 +1,225 @@
+"""
+MIT License
+
+Copyright (c) 2020-present phenom4n4n
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import logging
+import re
+import sys
+from collections import defaultdict
+from typing import TYPE_CHECKING, Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from rapidfuzz import fuzz, process
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+if TYPE_CHECKING:
+    from .objects import Tag
+
+__all__ = ("TagSearchIndex", "SCRIPT_SCORE_CUTOFF", "MULTI_WORKER_SUPPORTED")
+
+log = logging.getLogger("red.phenom4n4n.tags.search")
+
+# rapidfuzz.process.cdist, which scores in parallel, requires numpy
+MULTI_WORKER_SUPPORTED = np is not None
+
+TOKEN_RE = re.compile(r"\w+")
+
+# a tag whose name and alias scores are both under 70 can only reach the final score
+# threshold of 180 if its script score is above 40, so lower token scores never matter
+SCRIPT_SCORE_CUTOFF = 40
+
+
+class TagSearchIndex:
+    """
+    Search data for the unique tags in a scope.
+
+    Names and aliases are kept in flat lists so they can be scored in one rapidfuzz call,
+    and an inverted index of tagscript words means script scores are computed once per
+    distinct word rather than once per word per tag.
+    """
+
+    __slots__ = ("tokens", "_tag_tokens", "_arrays")
+
+    def __init__(self):
+        self.tokens: Dict[str, Set["Tag"]] = defaultdict(set)
+        self._tag_tokens: Dict["Tag", FrozenSet[str]] = {}
+        self._arrays: Optional[Tuple[List["Tag"], List[str], List[str], List[int]]] = None
+
+    def __repr__(self) -> str:
+        return f"<TagSearchIndex tags={len(self._tag_tokens)} tokens={len(self.tokens)}>"
+
+    def __len__(self) -> int:
+        return len(self._tag_tokens)
+
+    def add(self, tag: "Tag"):
+        if tag in self._tag_tokens:
+            self.remove(tag)
+        tokens = frozenset(TOKEN_RE.findall(tag.peek_tagscript()))
+        self._tag_tokens[tag] = tokens
+        for token in tokens:
+            self.tokens[token].add(tag)
+        self._arrays = None
+
+    def remove(self, tag: "Tag"):
+        for token in self._tag_tokens.pop(tag, ()):
+            tags = self.tokens[token]
+            tags.discard(tag)
+            if not tags:
+                del self.tokens[token]
+        self._arrays = None
+
+    def invalidate(self):
+        """Rebuild the name and alias lists on the next search."""
+        self._arrays = None
+
+    def memory_usage(self) -> int:
+        """Estimate the bytes used by the token sets, the inverted index and the name lists."""
+        size = sys.getsizeof(self.tokens) + sys.getsizeof(self._tag_tokens)
+        # the token strings are shared between the inverted index and each tag's token set
+        for token, tags in self.tokens.items():
+            size += sys.getsizeof(token) + sys.getsizeof(tags)
+        size += sum(map(sys.getsizeof, self._tag_tokens.values()))
+        if self._arrays is not None:
+            size += sys.getsizeof(self._arrays) + sum(map(sys.getsizeof, self._arrays))
+            # lowercased names are copies, while aliases are shared with the tags
+            size += sum(map(sys.getsizeof, self._arrays[1]))
+        return size
+
+    def _get_arrays(self) -> Tuple[List["Tag"], List[str], List[str], List[int]]:
+        if self._arrays is None:
+            tags = list(self._tag_tokens)
+            names = [tag.name.lower() for tag in tags]
+            aliases = []
+            alias_owners = []
+            for index, tag in enumerate(tags):
+                for alias in tag.aliases:
+                    aliases.append(alias)
+                    alias_owners.append(index)
+            self._arrays = (tags, names, aliases, alias_owners)
+        return self._arrays
+
+    @staticmethod
+    def _batch_scores(
+        query: str, choices: List[str], scorer: Callable[..., float], workers: int
+    ) -> List[float]:
+        if not choices:
+            return []
+        if workers != 1 and MULTI_WORKER_SUPPORTED:
+            matrix = process.cdist(
+                [query], choices, scorer=scorer, dtype=np.float64, workers=workers
+            )
+            return matrix[0].tolist()
+        scores = [0] * len(choices)
+        for _, score, index in process.extract(query, choices, scorer=scorer, limit=None):
+            scores[index] = score
+        return scores
+
+    def search(self, query: str, *, workers: int = 1) -> List["Tag"]:
+        """
+        Search the scope's tags by name, alias and tagscript.
+
+        A tag matches if any of the three scores is at least 70 or their sum is over 180.
+        Results are ordered by total score, then by name.
+        """
+        tags, names, aliases, alias_owners = self._get_arrays()
+        if not tags:
+            return []
+        name_scores = self._batch_scores(query.lower(), names, fuzz.ratio, workers)
+        alias_scores = [0] * len(tags)
+        for owner, score in zip(
+            alias_owners, self._batch_scores(query, aliases, fuzz.QRatio, workers)
+        ):
+            if score > alias_scores[owner]:
+                alias_scores[owner] = score
+        script_scores = self.score_tagscripts(query)
+
+        matches = []
+        for tag, name_score, alias_score in zip(tags, name_scores, alias_scores):
+            if tag in script_scores:
+                script_score = script_scores[tag]
+            elif name_score >= 70 or alias_score >= 70 or name_score + alias_score > 140:
+                # only script scores that could decide a match on their own are indexed,
+                # so fetch the exact score for tags that matched by name or alias
+                script_score = self.script_score(tag, query)
+            else:
+                continue
+
+            scores = (name_score, alias_score, script_score)
+            final_score = sum(scores)
+            log.debug(
+                "search: %r | %s NAME: %s ALIAS: %s SCRIPT %s FINAL %s",
+                query,
+                tag.name,
+                name_score,
+                alias_score,
+                script_score,
+                final_score,
+            )
+            if any(score >= 70 for score in scores) or final_score > 180:
+                matches.append((final_score, tag))
+        matches.sort(key=lambda match: (-match[0], match[1].name))
+        return [tag for _, tag in matches]
+
+    def score_tagscripts(self, query: str) -> Dict["Tag", float]:
+        """
+        Get the script scores of tags that contain the query or a word scoring above
+        `SCRIPT_SCORE_CUTOFF`. Tags missing from the result score lower than the cutoff.
+        """
+        scores = {}
+        query_lower = query.lower()
+        vocabulary = list(self.tokens)
+        for token, score, _ in process.extract(
+            query,
+            vocabulary,
+            scorer=fuzz.QRatio,
+            score_cutoff=SCRIPT_SCORE_CUTOFF,
+            limit=None,
+        ):
+            for tag in self.tokens[token]:
+                if score > scores.get(tag, 0):
+                    scores[tag] = score
+
+        if TOKEN_RE.fullmatch(query_lower):
+            # a run of word characters can only occur inside a single token
+            for token in vocabulary:
+                if query_lower in token.lower():
+                    for tag in self.tokens[token]:
+                        scores[tag] = 100
+        else:
+            for tag in self._tag_tokens:
+                if query_lower in tag.peek_tagscript().lower():
+                    scores[tag] = 100
+        return scores
+
+    def script_score(self, tag: "Tag", query: str) -> float:
+        """Get a single tag's exact script score."""
+        if query.lower() in tag.peek_tagscript().lower():
+            return 100
+        if search := process.extractOne(
+            query, tuple(self._tag_tokens.get(tag, ())), scorer=fuzz.QRatio
+        ):
+            return search[1]
+        return 0
@@ -0,0 +1,134 @@
+"""
+MIT License
+
+Copyright (c) 2020-present phenom4n4n
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from typing import Any, Dict, Iterator, Tuple
+
+import TagScriptEngine as tse
+from redbot.core import commands
+
+__all__ = ("SeedVariables",)
+
+# variables that share one adapter, keyed by the first name
+SEED_GROUPS: Tuple[Tuple[str, ...], ...] = (
+    ("author", "user"),
+    ("target", "member"),
+    ("channel",),
+    ("guild", "server"),
+)
+SEED_NAMES: Dict[str, Tuple[str, ...]] = {name: group for group in SEED_GROUPS for name in group}
+
+
+class SeedVariables(dict):
+    """
+    The seed variables for a tag invocation, with adapters created the first time they're used.
+
+    Membership checks and lookups go through the pending seed names, so tags that never
+    reference a seed variable don't create any adapters. Iterating creates every pending adapter.
+    """
+
+    __slots__ = ("ctx", "_pending")
+
+    def __init__(self, ctx: commands.Context, **variables: tse.Adapter):
+        super().__init__()
+        self.ctx = ctx
+        self._pending = set(SEED_NAMES)
+        if not ctx.guild:
+            self._pending.difference_update(SEED_NAMES["guild"])
+        self.update(variables)
+
+    def __repr__(self) -> str:
+        return f"<SeedVariables {dict.__repr__(self)} pending={sorted(self._pending)}>"
+
+    def _create_adapter(self, group: Tuple[str, ...]) -> tse.Adapter:
+        ctx = self.ctx
+        name = group[0]
+        if name == "author":
+            return tse.MemberAdapter(ctx.author)
+        if name == "target":
+            mentions = ctx.message.mentions
+            return tse.MemberAdapter(mentions[0] if mentions else ctx.author)
+        if name == "channel":
+            return tse.ChannelAdapter(ctx.channel)
+        return tse.GuildAdapter(ctx.guild)
+
+    def _materialize(self, key: str) -> tse.Adapter:
+        group = SEED_NAMES[key]
+        adapter = self._create_adapter(group)
+        for name in group:
+            if name in self._pending:
+                self._pending.discard(name)
+                dict.__setitem__(self, name, adapter)
+        return adapter
+
+    def materialize_all(self):
+        for key in list(self._pending):
+            if key in self._pending:
+                self._materialize(key)
+
+    def __missing__(self, key: str) -> tse.Adapter:
+        if key in self._pending:
+            return self._materialize(key)
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._pending or dict.__contains__(self, key)
+
+    def __setitem__(self, key: str, value: tse.Adapter):
+        self._pending.discard(key)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key: str):
+        if key in self._pending:
+            self._pending.discard(key)
+        else:
+            dict.__delitem__(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __len__(self) -> int:
+        return dict.__len__(self) + len(self._pending)
+
+    def __iter__(self) -> Iterator[str]:
+        self.materialize_all()
+        return dict.__iter__(self)
+
+    def keys(self):
+        self.materialize_all()
+        return dict.keys(self)
+
+    def values(self):
+        self.materialize_all()
+        return dict.values(self)
+
+    def items(self):
+        self.materialize_all()
+        return dict.items(self)
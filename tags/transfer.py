@@ -0,0 +1,153 @@
+"""
+MIT License
+
+Copyright (c) 2020-present phenom4n4n
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import gzip
+import json
+import zlib
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+from .objects import ALIAS_LIMIT, GLOBAL_SCOPE, TAGSCRIPT_LIMIT
+
+__all__ = (
+    "TransferError",
+    "TransferReadError",
+    "dump_tag",
+    "load_tag",
+    "iter_lines",
+    "group_lines",
+)
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+class TransferError(ValueError):
+    """Raised when a line of a tag export is invalid."""
+
+
+class TransferReadError(TransferError):
+    """Raised when the rest of an export can't be read, such as a truncated or corrupt gzip."""
+
+    def __init__(self, line: int):
+        self.line = line
+        super().__init__(f"The file couldn't be read or decompressed after line {line}.")
+
+
+def dump_tag(scope: str, name: str, data: dict) -> bytes:
+    line = {"guild_id": None if scope == GLOBAL_SCOPE else int(scope), "name": name}
+    line.update(data)
+    return json.dumps(line, separators=(",", ":"), ensure_ascii=False).encode() + b"\n"
+
+
+def _check_type(line: dict, key: str, types: Tuple[type, ...], default: Any = None) -> Any:
+    value = line.get(key, default)
+    if not isinstance(value, types) or isinstance(value, bool) and bool not in types:
+        raise TransferError(f"`{key}` has an invalid value.")
+    return value
+
+
+def load_tag(raw: bytes) -> Tuple[str, str, dict]:
+    """Parse and validate a single exported tag into its scope, name and Config data."""
+    try:
+        line = json.loads(raw)
+    except ValueError:
+        raise TransferError("Invalid JSON.") from None
+    if not isinstance(line, dict):
+        raise TransferError("Expected a JSON object.")
+
+    guild_id: Optional[int] = _check_type(line, "guild_id", (int, type(None)))
+    name: str = _check_type(line, "name", (str,))
+    if not name or "".join(name.split()) != name:
+        raise TransferError("Tag names can't be empty or contain whitespace.")
+    tagscript: str = _check_type(line, "tag", (str,))
+    if len(tagscript) > TAGSCRIPT_LIMIT:
+        raise TransferError(f"TagScript is longer than {TAGSCRIPT_LIMIT} characters.")
+    aliases: List[str] = _check_type(line, "aliases", (list,), [])
+    if len(aliases) > ALIAS_LIMIT or not all(
+        isinstance(alias, str) and alias and "".join(alias.split()) == alias for alias in aliases
+    ):
+        raise TransferError("`aliases` has an invalid value.")
+    uses: int = _check_type(line, "uses", (int,), 0)
+    created_at = _check_type(line, "created_at", (int, float, type(None)))
+
+    data = {
+        "author_id": _check_type(line, "author_id", (int, type(None))),
+        "uses": max(uses, 0),
+        "tag": tagscript,
+        "aliases": [alias for alias in dict.fromkeys(aliases) if alias != name],
+        "created_at": created_at,
+    }
+    return str(guild_id) if guild_id else GLOBAL_SCOPE, name, data
+
+
+def iter_lines(fp: IO[bytes]) -> Iterator[Tuple[int, bytes]]:
+    """
+    Iterate the non-empty lines of a plain or gzipped JSONL file with their line numbers.
+
+    Raises `TransferReadError` with the last line read if the file can't be decompressed.
+    """
+    magic = fp.read(2)
+    fp.seek(0)
+    if magic == GZIP_MAGIC:
+        fp = gzip.GzipFile(fileobj=fp)
+    number = 0
+    try:
+        for number, line in enumerate(fp, 1):
+            if line.strip():
+                yield number, line
+    except (OSError, EOFError, zlib.error) as error:
+        raise TransferReadError(number) from error
+
+
+def group_lines(
+    lines: Iterator[Tuple[int, bytes]], errors: Dict[int, str]
+) -> Iterator[Tuple[str, Dict[str, dict], Dict[str, int]]]:
+    """
+    Group consecutive valid tags by scope, along with the line number of each tag.
+
+    Exports are written one scope at a time, so each scope is normally yielded once. Invalid
+    lines are recorded in `errors` by line number. If the file can't be read to the end, the
+    tags read so far are still yielded before `TransferReadError` is raised.
+    """
+    current_scope = None
+    tags: Dict[str, dict] = {}
+    line_numbers: Dict[str, int] = {}
+    try:
+        for number, raw in lines:
+            try:
+                scope, name, data = load_tag(raw)
+            except TransferError as error:
+                errors[number] = str(error)
+                continue
+            if scope != current_scope:
+                if tags:
+                    yield current_scope, tags, line_numbers
+                current_scope, tags, line_numbers = scope, {}, {}
+            tags[name] = data
+            line_numbers[name] = number
+    except TransferReadError:
+        if tags:
+            yield current_scope, tags, line_numbers
+        raise
+    if tags:
+        yield current_scope, tags, line_numbers
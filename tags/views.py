@@ -1,10 +1,10 @@
-from typing import Any, List, Optional, Tuple
+from typing import Any, Callable, List, Optional, Sequence, Tuple
 
 import discord
 from redbot.core import commands
 from redbot.vendored.discord.ext.menus import ListPageSource
 
-__all__ = ("ConfirmationView", "PageSource", "PaginatedView")
+__all__ = ("ConfirmationView", "LazyPageSource", "PageSource", "PaginatedView")
 
 
 class BaseView(discord.ui.View):
@@ -69,7 +69,7 @@ class ConfirmationView(BaseView):
         timeout: int = 60,
         *,
         cancel_message: str = "Action cancelled.",
-        **kwargs
+        **kwargs,
     ) -> bool:
         view = cls(timeout, cancel_message=cancel_message)
         await view.send_initial_message(ctx, content, **kwargs)
@@ -85,6 +85,23 @@ class PageSource(ListPageSource):
         return page
 
 
+class LazyPageSource(ListPageSource):
+    """A page source that formats each page from its slice of entries when it's shown."""
+
+    def __init__(
+        self,
+        entries: Sequence[Any],
+        formatter: Callable[[int, List[Any]], Any],
+        *,
+        per_page: int = 10,
+    ):
+        super().__init__(entries, per_page=per_page)
+        self.formatter = formatter
+
+    async def format_page(self, view: discord.ui.View, page: List[Any]):
+        return self.formatter(view.current_page, page)
+
+
 class Button(discord.ui.Button):
     def __init__(
         self, label: str, style: discord.ButtonStyle = discord.ButtonStyle.blurple, **kwargs